@@ -0,0 +1,59 @@
+"""
+Rebuilds sales_rollup for every closed UTC day from the paid orders already in the database.
+
+    python -m src.analytics.backfill [--batch-size 500]
+
+Only buckets before today's UTC midnight are rebuilt; the live paid transition keeps owning
+the current day, so the job can run while the restaurant is open. Readers see partially
+rebuilt history until it finishes.
+"""
+import argparse
+import asyncio
+from datetime import datetime, timezone
+from uuid import UUID
+
+from loguru import logger
+
+from src.analytics.repositories import SalesRollupRepository
+from src.db.database import AsyncSession, async_engine
+
+BACKFILL_BATCH_SIZE = 500
+KEYSET_START = (datetime(1970, 1, 1, tzinfo=timezone.utc), UUID(int=0))
+
+
+async def backfill_sales_rollups(batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    cutoff = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    async with AsyncSession() as session:
+        repo = SalesRollupRepository(session)
+        await repo.delete_buckets_before(cutoff)
+        await session.commit()
+        logger.info(f"Backfill: cleared rollup buckets before {cutoff.isoformat()}")
+
+        total, after = 0, KEYSET_START
+        while True:
+            batch = await repo.get_paid_order_batch(cutoff, after, batch_size)
+            if not batch:
+                break
+            # Her parti kendi transaction'ında; uzun süren kilitler oluşmaz
+            await repo.record_paid_orders([order_id for order_id, _ in batch])
+            await session.commit()
+            total += len(batch)
+            after = (batch[-1][1], batch[-1][0])
+            logger.info(f"Backfill: {total} orders rolled up")
+
+    logger.info(f"Backfill finished: {total} paid orders before {cutoff.isoformat()}")
+    return total
+
+
+async def main(batch_size: int):
+    try:
+        await backfill_sales_rollups(batch_size)
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    asyncio.run(main(parser.parse_args().batch_size))
@@ -0,0 +1,165 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import bindparam, delete, func, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import MenuCategory, MenuItem, RollupDimension, RollupGranularity, SalesRollup, User
+
+TOTAL_DIMENSION_ID = UUID(int=0)
+
+# Siparişin ödendiği an: son başarılı ödeme (payment.paid_at naive UTC), yoksa siparişin kendi zamanı
+PAID_AT_SQL = """
+    COALESCE(
+        (SELECT timezone('UTC', max(p.paid_at)) FROM payment p
+          WHERE p.order_id = o.id AND p.is_successful),
+        o.updated_at,
+        o.created_at
+    )
+"""
+
+# One statement per batch of newly paid orders: explode each order into its dimension facts,
+# bucket them by hour and day, and add them onto the existing counters.
+RECORD_PAID_ORDERS_SQL = text(f"""
+WITH paid AS (
+    SELECT o.id, o.waiter_id, o.table_id, o.total_amount, {PAID_AT_SQL} AS paid_at
+    FROM "order" o
+    WHERE o.id = ANY(:order_ids)
+),
+lines AS (
+    SELECT paid.id AS order_id, paid.paid_at, oi.menu_item_id, mi.category_id,
+           oi.quantity, oi.unit_price * oi.quantity AS amount
+    FROM paid
+    JOIN order_item oi ON oi.order_id = paid.id
+    LEFT JOIN menu_item mi ON mi.id = oi.menu_item_id
+),
+orders AS (
+    SELECT paid.id AS order_id, paid.paid_at, paid.waiter_id, paid.table_id,
+           COALESCE(sum(lines.quantity), 0) AS quantity, paid.total_amount AS amount
+    FROM paid
+    LEFT JOIN lines ON lines.order_id = paid.id
+    GROUP BY paid.id, paid.paid_at, paid.waiter_id, paid.table_id, paid.total_amount
+),
+facts (dimension, dimension_id, order_id, paid_at, quantity, amount) AS (
+    SELECT 'total', CAST(:total_id AS uuid), order_id, paid_at, quantity, amount FROM orders
+    UNION ALL
+    SELECT 'waiter', waiter_id, order_id, paid_at, quantity, amount FROM orders WHERE waiter_id IS NOT NULL
+    UNION ALL
+    SELECT 'table', table_id, order_id, paid_at, quantity, amount FROM orders WHERE table_id IS NOT NULL
+    UNION ALL
+    SELECT 'menu_item', menu_item_id, order_id, paid_at, quantity, amount FROM lines WHERE menu_item_id IS NOT NULL
+    UNION ALL
+    SELECT 'category', category_id, order_id, paid_at, quantity, amount FROM lines WHERE category_id IS NOT NULL
+)
+INSERT INTO sales_rollup
+    (granularity, dimension, dimension_id, bucket_start, order_count, item_count, revenue, is_active)
+SELECT g.granularity, f.dimension, f.dimension_id, date_trunc(g.granularity, f.paid_at, 'UTC'),
+       count(DISTINCT f.order_id), sum(f.quantity), sum(f.amount), true
+FROM facts f
+CROSS JOIN (VALUES ('hour'), ('day')) AS g (granularity)
+GROUP BY 1, 2, 3, 4
+ORDER BY 1, 2, 3, 4
+ON CONFLICT (granularity, dimension, bucket_start, dimension_id) DO UPDATE SET
+    order_count = sales_rollup.order_count + EXCLUDED.order_count,
+    item_count = sales_rollup.item_count + EXCLUDED.item_count,
+    revenue = sales_rollup.revenue + EXCLUDED.revenue,
+    updated_at = now()
+""").bindparams(
+    bindparam("order_ids", type_=ARRAY(PG_UUID(as_uuid=True))),
+    bindparam("total_id", value=str(TOTAL_DIMENSION_ID)),
+)
+
+PAID_ORDERS_BEFORE_SQL = text(f"""
+SELECT o.id, o.created_at
+FROM "order" o
+WHERE o.is_paid
+  AND {PAID_AT_SQL} < :cutoff
+  AND (o.created_at, o.id) > (:after_created_at, :after_id)
+ORDER BY o.created_at, o.id
+LIMIT :limit
+""")
+
+
+class SalesRollupRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def record_paid_orders(self, order_ids: Sequence[UUID]) -> None:
+        """Adds the given orders onto the rollups; call once per order, in the transaction that marks it paid."""
+        if not order_ids:
+            return
+        await self.session.execute(RECORD_PAID_ORDERS_SQL, {"order_ids": list(order_ids)})
+
+    async def delete_buckets_before(self, cutoff: datetime) -> None:
+        await self.session.execute(delete(SalesRollup).where(SalesRollup.bucket_start < cutoff))
+
+    async def get_paid_order_batch(
+        self, cutoff: datetime, after: Tuple[datetime, UUID], limit: int
+    ) -> List[Tuple[UUID, datetime]]:
+        """Next batch of orders paid before `cutoff`, keyset-ordered by (created_at, id)."""
+        result = await self.session.execute(
+            PAID_ORDERS_BEFORE_SQL,
+            {"cutoff": cutoff, "after_created_at": after[0], "after_id": after[1], "limit": limit},
+        )
+        return [(row.id, row.created_at) for row in result]
+
+    async def get_revenue_series(
+        self, granularity: RollupGranularity, start: datetime, end: datetime
+    ) -> List:
+        stmt = (
+            select(SalesRollup.bucket_start, SalesRollup.order_count, SalesRollup.item_count, SalesRollup.revenue)
+            .where(
+                SalesRollup.granularity == granularity.value,
+                SalesRollup.dimension == RollupDimension.TOTAL.value,
+                SalesRollup.bucket_start >= start,
+                SalesRollup.bucket_start < end,
+            )
+            .order_by(SalesRollup.bucket_start)
+        )
+        return (await self.session.execute(stmt)).all()
+
+    async def get_totals_by_dimension(
+        self,
+        dimension: RollupDimension,
+        granularity: RollupGranularity,
+        start: datetime,
+        end: datetime,
+        order_by: str = "revenue",
+        limit: Optional[int] = None,
+    ) -> List:
+        """Sums each dimension member's buckets in [start, end); `bucket_count` is the number of non-empty buckets."""
+        totals = {
+            "revenue": func.sum(SalesRollup.revenue).label("revenue"),
+            "item_count": func.sum(SalesRollup.item_count).label("item_count"),
+            "order_count": func.sum(SalesRollup.order_count).label("order_count"),
+        }
+        stmt = (
+            select(SalesRollup.dimension_id, *totals.values(), func.count().label("bucket_count"))
+            .where(
+                SalesRollup.granularity == granularity.value,
+                SalesRollup.dimension == dimension.value,
+                SalesRollup.bucket_start >= start,
+                SalesRollup.bucket_start < end,
+            )
+            .group_by(SalesRollup.dimension_id)
+            .order_by(totals[order_by].desc(), SalesRollup.dimension_id)
+        )
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return (await self.session.execute(stmt)).all()
+
+    async def get_names(self, dimension: RollupDimension, ids: Iterable[UUID]) -> Dict[UUID, Optional[str]]:
+        """Display names for a page of dimension ids; tables and totals have none."""
+        columns = {
+            RollupDimension.MENU_ITEM: (MenuItem.__table__.c.id, MenuItem.__table__.c.name),
+            RollupDimension.CATEGORY: (MenuCategory.__table__.c.id, MenuCategory.__table__.c.name),
+            RollupDimension.WAITER: (User.__table__.c.id, User.__table__.c.username),
+        }.get(dimension)
+        ids = list(ids)
+        if columns is None or not ids:
+            return {}
+        id_column, name_column = columns
+        result = await self.session.execute(select(id_column, name_column).where(id_column.in_(ids)))
+        return {row[0]: row[1] for row in result}
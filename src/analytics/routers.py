@@ -0,0 +1,56 @@
+from datetime import datetime
+from typing import List, Literal
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.analytics.repositories import SalesRollupRepository
+from src.analytics.schemas import RevenueReport, TopEntry, WaiterThroughput
+from src.analytics.services import AnalyticsService
+from src.auth.schemas import UserPrincipal
+from src.db.dependencies import get_db
+from src.db.models import RollupDimension, RollupGranularity
+from src.user.dependencies import get_current_admin
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+def get_analytics_service(db: AsyncSession = Depends(get_db)) -> AnalyticsService:
+    return AnalyticsService(SalesRollupRepository(db))
+
+
+@router.get("/revenue", response_model=RevenueReport)
+async def get_revenue(
+    start: datetime,
+    end: datetime,
+    granularity: RollupGranularity = Query(RollupGranularity.DAY),
+    service: AnalyticsService = Depends(get_analytics_service),
+    _admin: UserPrincipal = Depends(get_current_admin),
+):
+    """Revenue per hour/day bucket whose start falls in [start, end)."""
+    return await service.get_revenue(granularity, start, end)
+
+
+@router.get("/top-items", response_model=List[TopEntry])
+async def get_top_items(
+    start: datetime,
+    end: datetime,
+    dimension: Literal["menu_item", "category", "table"] = Query("menu_item"),
+    order_by: Literal["revenue", "item_count", "order_count"] = Query("revenue"),
+    granularity: RollupGranularity = Query(RollupGranularity.DAY),
+    limit: int = Query(10, ge=1, le=100),
+    service: AnalyticsService = Depends(get_analytics_service),
+    _admin: UserPrincipal = Depends(get_current_admin),
+):
+    return await service.get_top(RollupDimension(dimension), granularity, start, end, order_by, limit)
+
+
+@router.get("/waiters/throughput", response_model=List[WaiterThroughput])
+async def get_waiter_throughput(
+    start: datetime,
+    end: datetime,
+    limit: int = Query(50, ge=1, le=200),
+    service: AnalyticsService = Depends(get_analytics_service),
+    _admin: UserPrincipal = Depends(get_current_admin),
+):
+    return await service.get_waiter_throughput(start, end, limit)
@@ -0,0 +1,47 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from src.db.models import RollupDimension, RollupGranularity
+
+
+class RevenueBucket(BaseModel):
+    bucket_start: datetime
+    order_count: int
+    item_count: int
+    revenue: Decimal
+
+    class Config:
+        from_attributes = True
+
+
+class RevenueReport(BaseModel):
+    granularity: RollupGranularity
+    start: datetime
+    end: datetime
+    order_count: int
+    item_count: int
+    revenue: Decimal
+    buckets: List[RevenueBucket]
+
+
+class TopEntry(BaseModel):
+    dimension: RollupDimension
+    id: UUID
+    name: Optional[str] = None
+    order_count: int
+    item_count: int
+    revenue: Decimal
+
+
+class WaiterThroughput(BaseModel):
+    waiter_id: UUID
+    name: Optional[str] = None
+    order_count: int
+    item_count: int
+    revenue: Decimal
+    active_hours: int
+    orders_per_active_hour: float
@@ -0,0 +1,79 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import List
+
+from fastapi import HTTPException
+
+from src.analytics.repositories import SalesRollupRepository
+from src.analytics.schemas import RevenueBucket, RevenueReport, TopEntry, WaiterThroughput
+from src.db.models import RollupDimension, RollupGranularity
+
+
+class AnalyticsService:
+    """Reports read only from sales_rollup; order_item is never scanned here."""
+
+    def __init__(self, repo: SalesRollupRepository):
+        self.repo = repo
+
+    @staticmethod
+    def _check_range(start: datetime, end: datetime):
+        if start >= end:
+            raise HTTPException(status_code=400, detail="start must be before end")
+
+    async def get_revenue(self, granularity: RollupGranularity, start: datetime, end: datetime) -> RevenueReport:
+        self._check_range(start, end)
+        rows = await self.repo.get_revenue_series(granularity, start, end)
+        buckets = [RevenueBucket.model_validate(row) for row in rows]
+        return RevenueReport(
+            granularity=granularity,
+            start=start,
+            end=end,
+            order_count=sum(bucket.order_count for bucket in buckets),
+            item_count=sum(bucket.item_count for bucket in buckets),
+            revenue=sum((bucket.revenue for bucket in buckets), Decimal("0")),
+            buckets=buckets,
+        )
+
+    async def get_top(
+        self,
+        dimension: RollupDimension,
+        granularity: RollupGranularity,
+        start: datetime,
+        end: datetime,
+        order_by: str,
+        limit: int,
+    ) -> List[TopEntry]:
+        self._check_range(start, end)
+        rows = await self.repo.get_totals_by_dimension(dimension, granularity, start, end, order_by, limit)
+        names = await self.repo.get_names(dimension, (row.dimension_id for row in rows))
+        return [
+            TopEntry(
+                dimension=dimension,
+                id=row.dimension_id,
+                name=names.get(row.dimension_id),
+                order_count=row.order_count,
+                item_count=row.item_count,
+                revenue=row.revenue,
+            )
+            for row in rows
+        ]
+
+    async def get_waiter_throughput(self, start: datetime, end: datetime, limit: int) -> List[WaiterThroughput]:
+        self._check_range(start, end)
+        # Saatlik özetlerde her dolu kova garsonun sipariş kapattığı bir saattir
+        rows = await self.repo.get_totals_by_dimension(
+            RollupDimension.WAITER, RollupGranularity.HOUR, start, end, "order_count", limit
+        )
+        names = await self.repo.get_names(RollupDimension.WAITER, (row.dimension_id for row in rows))
+        return [
+            WaiterThroughput(
+                waiter_id=row.dimension_id,
+                name=names.get(row.dimension_id),
+                order_count=row.order_count,
+                item_count=row.item_count,
+                revenue=row.revenue,
+                active_hours=row.bucket_count,
+                orders_per_active_hour=round(row.order_count / row.bucket_count, 2),
+            )
+            for row in rows
+        ]
@@ -1,13 +1,15 @@
-from fastapi import Depends, Request, HTTPException
+from fastapi import Depends, Request, HTTPException, Query, WebSocketException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio.session import AsyncSession
 from src.db.dependencies import get_db
 from src.auth.utils import decode_token
 from src.errors import InvalidToken, RefreshTokenRequired, AccessTokenRequired
 from src.core.redis_manager import TokenBlocklist
+from src.auth.token_cache import token_cache, revoked_tokens
 from src.user.repositories import UserRepository
 from src.errors import UserNotFound
-from src.auth.schemas import UserProfileResponse
+from src.auth.schemas import UserPrincipal
+from src.auth.principal_cache import principal_cache
 from loguru import logger 
 
 class TokenBearer(HTTPBearer):
@@ -21,7 +23,16 @@ class TokenBearer(HTTPBearer):
 
     async def __call__(self, request: Request, credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer())) -> dict:
         """Extract token from request & validate it."""
-        token = credentials.credentials
+        return await self.validate_token(credentials.credentials)
+
+    async def validate_token(self, token: str) -> dict:
+        """Decrypt and decode the token, then check the blocklist and the token type."""
+        # Fast path: already verified by this worker and not revoked since
+        token_data = token_cache.get(token)
+        if token_data is not None:
+            await self.verify_token_type(token_data)
+            return token_data
+
         logger.debug(f"Received token: {token[:10]}...")  # Avoid logging full tokens in production
 
         token_data = await decode_token(token)
@@ -31,12 +42,13 @@ class TokenBearer(HTTPBearer):
             logger.warning("Token decoding failed or missing 'jti'")
             raise InvalidToken()
 
-        if await self.token_blocklist.is_token_blacklisted(token_data["jti"]):
+        if token_data["jti"] in revoked_tokens or await self.token_blocklist.is_token_blacklisted(token_data["jti"]):
             logger.warning(f"Token with jti={token_data['jti']} is blacklisted")
             raise InvalidToken()
 
         await self.verify_token_type(token_data)
 
+        token_cache.put(token, token_data)
         logger.info(f"Token verified successfully for user_id={token_data.get('user', {}).get('id')}")
         return token_data
 
@@ -64,18 +76,36 @@ class RefreshTokenBearer(TokenBearer):
     token_type = "refresh"
 
 
+async def get_websocket_token_data(token: str = Query(..., description="Access token")) -> dict:
+    """Validates the access token of a websocket connection.
+
+    Browsers cannot set headers on websocket handshakes, so the token comes as `?token=`.
+    """
+    try:
+        return await AccessTokenBearer().validate_token(token)
+    except (InvalidToken, AccessTokenRequired):
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
+
+
 async def get_current_user(
     token_data: dict = Depends(AccessTokenBearer()),
     db: AsyncSession = Depends(get_db)
-):
+) -> UserPrincipal:
     """Extracts and validates the current user from the access token."""
-    logger.info(f"Fetching user with ID: {token_data['user']['id']}")
+    user_id = token_data["user"]["id"]
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    generation = principal_cache.generation(user_id)
+    logger.info(f"Fetching user with ID: {user_id}")
     user_repo = UserRepository(db)
 
-    user = await user_repo.get_by_id(token_data["user"]["id"])
-    if not user:
-        logger.error(f"User not found for ID: {token_data['user']['id']}")
+    principal = await user_repo.get_principal(user_id)
+    if not principal:
+        logger.error(f"User not found for ID: {user_id}")
         raise UserNotFound()
 
-    logger.info(f"User found: {user.primary_email}")
-    return UserProfileResponse.model_validate(user)
+    logger.info(f"User found: {principal.primary_email}")
+    principal_cache.put(principal, generation)
+    return principal
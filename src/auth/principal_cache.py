@@ -0,0 +1,107 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+from src.auth.schemas import UserPrincipal
+from src.core.redis_manager import PubSubChannel
+from src.core.settings import settings
+
+user_invalidation_channel = PubSubChannel("auth:user-invalidations")
+
+
+class PrincipalCache:
+    """
+    Per-process TTL cache of slim user principals (id, type, email, verified).
+
+    Every worker drops a user as soon as any worker calls `invalidate`, and the
+    TTL bounds staleness if a message is lost. Bypassed while not subscribed.
+
+    Each drop bumps the user's generation. A reader takes `generation(user_id)`
+    before loading from the DB and passes it to `put`, which skips the write when
+    the user was invalidated in the meantime; otherwise a principal read just
+    before a role change could be cached for the whole TTL.
+    """
+
+    def __init__(self, ttl_seconds: int, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, UserPrincipal]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0  # clear() bumps it: every read in flight becomes stale
+
+    def get(self, user_id) -> Optional[UserPrincipal]:
+        if not user_invalidation_channel.is_subscribed:
+            return None
+        entry = self._entries.get(str(user_id))
+        if entry is None:
+            return None
+        expires_at, principal = entry
+        if expires_at <= time.monotonic():
+            self.discard(user_id)
+            return None
+        self._entries.move_to_end(str(user_id))
+        return principal
+
+    def generation(self, user_id) -> Tuple[int, int]:
+        """Token to pass to `put`; changes whenever the user is dropped."""
+        return self._epoch, self._generations.get(str(user_id), 0)
+
+    def put(self, principal: UserPrincipal, generation: Tuple[int, int]):
+        if not user_invalidation_channel.is_subscribed:
+            return
+        if generation != self.generation(principal.id):
+            # Invalidated while the caller was reading it: the principal may already be stale
+            return
+        self._entries[str(principal.id)] = (time.monotonic() + self.ttl_seconds, principal)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def discard(self, user_id):
+        self._entries.pop(str(user_id), None)
+        if len(self._generations) >= self.max_size:
+            # Sayaçlar sınırsız büyümesin: sıfırlarken epoch'u artır, devam eden okumalar yine reddedilir
+            self.clear()
+        self._generations[str(user_id)] = self._generations.get(str(user_id), 0) + 1
+
+    def clear(self):
+        self._entries.clear()
+        self._generations.clear()
+        self._epoch += 1
+
+    async def invalidate(self, user_id):
+        """Drops the user from the cache of every worker."""
+        self.discard(user_id)
+        try:
+            await user_invalidation_channel.publish({"user_id": str(user_id)})
+        except Exception as e:
+            # Other workers fall back to the TTL
+            logger.error(f"Failed to publish invalidation for user {user_id}: {e}")
+
+
+principal_cache = PrincipalCache(ttl_seconds=settings.PRINCIPAL_CACHE_TTL, max_size=settings.TOKEN_CACHE_SIZE)
+_listener: Optional[asyncio.Task] = None
+
+
+async def start_principal_listener():
+    global _listener
+    if _listener is None or _listener.done():
+        _listener = asyncio.create_task(
+            user_invalidation_channel.consume(
+                lambda message: principal_cache.discard(message["user_id"]),
+                principal_cache.clear,
+            )
+        )
+
+
+async def stop_principal_listener():
+    global _listener
+    if _listener is not None:
+        _listener.cancel()
+        try:
+            await _listener
+        except asyncio.CancelledError:
+            pass
+        _listener = None
+    await user_invalidation_channel.close()
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, BackgroundTasks
+from fastapi import APIRouter, Depends
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.db.dependencies import get_db
@@ -18,8 +18,8 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
 @router.post("/register")
-async def register_user(request: RegisterRequest, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
-    return await AuthService.register_user(request, background_tasks, db)
+async def register_user(request: RegisterRequest, db: AsyncSession = Depends(get_db)):
+    return await AuthService.register_user(request, db)
 
 @router.post("/verify", response_model=VerifyEmailResponse)
 async def verify_email(request: VerifyEmailRequest, db: AsyncSession = Depends(get_db)):
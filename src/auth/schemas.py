@@ -35,6 +35,10 @@ class UserProfileResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class UserPrincipal(UserProfileResponse):
+    """Slim, cacheable view of the authenticated user used for role checks."""
+    type: str = Field(..., description="Polymorphic user type (customer, waiter, kitchen_staff, admin)")
+
 class TokenResponse(BaseModel):
     access_token: str = Field(..., description="Access token for API authentication")
     refresh_token: Optional[str] = Field(None, description="Refresh token for obtaining new access tokens")
@@ -1,6 +1,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
+import time
 from datetime import timedelta
-from fastapi import HTTPException, BackgroundTasks
+from fastapi import HTTPException
 from src.user.repositories import UserRepository
 from src.auth.utils import (
     generate_passwd_hash, 
@@ -9,7 +10,9 @@ from src.auth.utils import (
     verify_password
 )
 from src.auth.utils import VerificationCodeManager
-from src.mail.mail import send_email, EmailSchema
+from src.mail.mail import EmailSchema
+from src.mail.queue import mail_queue
+from src.auth.token_cache import revoked_tokens
 from src.core.settings import settings
 from src.auth.schemas import (
     RegisterRequest, 
@@ -35,7 +38,7 @@ class AuthService:
     """Handles authentication operations (registration, verification, login)."""
 
     @staticmethod
-    async def register_user(request: RegisterRequest, background_tasks: BackgroundTasks, db: AsyncSession) -> RegisterResponse:
+    async def register_user(request: RegisterRequest, db: AsyncSession) -> RegisterResponse:
         """Register a new user and send a verification code."""
         user_repo = UserRepository(db)
 
@@ -69,7 +72,7 @@ class AuthService:
             subject="Verify Your Email",
             body=f"Your verification code is: {verification_code}"
         )
-        background_tasks.add_task(send_email, email_content)
+        await mail_queue.enqueue(email_content)
 
         return RegisterResponse(
             id= user.id,
@@ -87,14 +90,12 @@ class AuthService:
         if not user:
             raise UserNotFound()
 
-        # Retrieve stored verification code
-        stored_code = await VerificationCodeManager.get_code(request.email)
-        if not stored_code or stored_code != request.code:
+        # Check and consume the code in one step; concurrent requests cannot both pass
+        if not await VerificationCodeManager.consume_code(request.email, request.code):
             raise HTTPException(status_code=400, detail="Invalid or expired verification code")
 
         # Mark user as verified
         await user_repo.update(user.id, {"primary_email_verified": True})
-        await VerificationCodeManager.delete_code(request.email)
 
         # Generate JWT tokens
         user_data = {"id": str(user.id), "email": user.primary_email}
@@ -163,7 +164,7 @@ class AuthService:
     
     @staticmethod
     async def resend_verification_email(
-        current_user, background_tasks: BackgroundTasks, db: AsyncSession
+        current_user, db: AsyncSession
     ) -> RegisterResponse:
         """Resends a verification email if the user's email is not verified."""
         user_repo = UserRepository(db)
@@ -188,7 +189,7 @@ class AuthService:
             subject="Resend Email Verification",
             body=f"Your new verification code is: {verification_code}"
         )
-        background_tasks.add_task(send_email, email_content)
+        await mail_queue.enqueue(email_content)
 
         return RegisterResponse(message="Verification email resent successfully.")
     
@@ -201,5 +202,7 @@ class AuthService:
 
         # Blacklist the refresh token in Redis
         await TokenBlocklist.add_token_to_blocklist(token_id, expiry_seconds=900)
+        # This worker rejects it right away; the others hear it on the revocation channel
+        revoked_tokens.add(token_id, time.time() + 900)
 
         return {"message": "Successfully logged out"}
\ No newline at end of file
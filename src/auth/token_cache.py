@@ -0,0 +1,109 @@
+import asyncio
+import copy
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from loguru import logger
+from src.core.redis_manager import revocation_channel
+from src.core.settings import settings
+
+
+class RevokedTokens:
+    """Local copy of the revoked JTIs, fed by the revocation channel."""
+
+    def __init__(self):
+        self._expiry: Dict[str, float] = {}
+
+    def add(self, jti: str, expires_at: float):
+        self._expiry[jti] = expires_at
+        if len(self._expiry) > settings.TOKEN_CACHE_SIZE:
+            self.prune()
+
+    def prune(self):
+        now = time.time()
+        self._expiry = {jti: exp for jti, exp in self._expiry.items() if exp > now}
+
+    def __contains__(self, jti: str) -> bool:
+        return jti in self._expiry
+
+
+class VerifiedTokenCache:
+    """
+    Per-process LRU of tokens that already passed decryption, signature and blocklist checks.
+
+    Entries are keyed by a SHA-256 digest of the raw token and die at the token's `exp`.
+    The cache is bypassed while this process is not subscribed to the revocation
+    channel, since it could not hear about revoked tokens. Claims are copied in and
+    out, so a caller that edits its dict cannot change what later requests see.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        if not revocation_channel.is_subscribed:
+            return None
+        key = self._key(token)
+        token_data = self._entries.get(key)
+        if token_data is None:
+            self.misses += 1
+            return None
+        if token_data["exp"] <= time.time() or token_data["jti"] in revoked_tokens:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(token_data)
+
+    def put(self, token: str, token_data: dict):
+        if not revocation_channel.is_subscribed:
+            return
+        self._entries[self._key(token)] = copy.deepcopy(token_data)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+revoked_tokens = RevokedTokens()
+token_cache = VerifiedTokenCache(max_size=settings.TOKEN_CACHE_SIZE)
+_listener: Optional[asyncio.Task] = None
+
+
+def _on_revocation(message: dict):
+    revoked_tokens.add(message["jti"], message["expires_at"])
+
+
+def _on_revocation_resync():
+    # Revocations may have been missed: re-check every token against Redis once
+    logger.warning("Revocation feed interrupted, clearing verified token cache")
+    token_cache.clear()
+
+
+async def start_revocation_listener():
+    global _listener
+    if _listener is None or _listener.done():
+        _listener = asyncio.create_task(revocation_channel.consume(_on_revocation, _on_revocation_resync))
+
+
+async def stop_revocation_listener():
+    global _listener
+    if _listener is not None:
+        _listener.cancel()
+        try:
+            await _listener
+        except asyncio.CancelledError:
+            pass
+        _listener = None
+    await revocation_channel.close()
@@ -3,20 +3,37 @@ import uuid
 import os
 from datetime import datetime, timedelta, timezone
 import jwt
-from passlib.context import CryptContext
-from cryptography.fernet import Fernet, InvalidToken
+from functools import lru_cache
+from cryptography.fernet import InvalidToken
 from src.core.settings import settings
 import secrets
-from src.core.redis_manager import get_redis
+from src.core.redis_manager import RateLimitedKey
 from src.errors import TooManyRequests
+from src.core.executor import BoundedExecutor
 
 # Load encryption key securely
 SECRET_KEY = settings.SECRET_KEY
 FERNET_KEY = settings.FERNET_KEY
-fernet = Fernet(FERNET_KEY.encode())
 
-# Password hashing setup
-passwd_context = CryptContext(schemes=[settings.CRYPTO_SCHEME])
+
+# Fernet ve passlib ilk kullanımda kurulur; import zamanında maliyet yok
+@lru_cache(maxsize=None)
+def get_fernet():
+    from cryptography.fernet import Fernet
+    return Fernet(FERNET_KEY.encode())
+
+
+@lru_cache(maxsize=None)
+def get_passwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=[settings.CRYPTO_SCHEME])
+
+# hash/verify are CPU-bound (argon2/bcrypt release the GIL), keep them off the event loop
+password_executor = BoundedExecutor(
+    "password-hashing",
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
 
 ACCESS_TOKEN_EXPIRY = 2700
 REFRESH_TOKEN_EXPIRY = settings.REFRESH_TOKEN_EXPIRY * 3600*24
@@ -24,11 +41,11 @@ COOL_DOWN_SECONDS = 60
 
 async def generate_passwd_hash(password: str) -> str:
     logger.debug("Generating password hash")
-    return passwd_context.hash(password)
+    return await password_executor.run(get_passwd_context().hash, password)
 
 async def verify_password(password: str, hashed_password: str) -> bool:
     logger.debug("Verifying password against stored hash")
-    return passwd_context.verify(password, hashed_password)
+    return await password_executor.run(get_passwd_context().verify, password, hashed_password)
 
 async def create_access_token(user_data: dict, expiry: timedelta = None, refresh: bool = False) -> str:
     logger.info(f"Creating {'refresh' if refresh else f'access {ACCESS_TOKEN_EXPIRY}'} token for user_id={user_data.get('id')}")
@@ -43,14 +60,14 @@ async def create_access_token(user_data: dict, expiry: timedelta = None, refresh
         }
         token = jwt.encode(payload, SECRET_KEY, algorithm="HS256")
         logger.debug(f"JWT token successfully created and encrypted {token}")
-        return fernet.encrypt(token.encode()).decode()
+        return get_fernet().encrypt(token.encode()).decode()
     except Exception:
         logger.error(f"faild to create token {Exception}")
 
 async def decode_token(token: str) -> dict:
     logger.debug("Attempting to decrypt and decode token")
     try:
-        decrypted_token = fernet.decrypt(token.encode()).decode()
+        decrypted_token = get_fernet().decrypt(token.encode()).decode()
         decoded = jwt.decode(decrypted_token, SECRET_KEY, algorithms=["HS256"])
         logger.debug(f"Token decoded successfully: jti={decoded.get('jti')}, user_id={decoded['user'].get('id')}")
         return decoded
@@ -65,7 +82,9 @@ async def decode_token(token: str) -> dict:
         return None
 
 class VerificationCodeManager:
-    """Handles storing, retrieving, and deleting verification codes in Redis."""
+    """Handles storing, checking, and consuming verification codes in Redis."""
+
+    codes = RateLimitedKey("verify", ttl_seconds=300, cooldown_seconds=COOL_DOWN_SECONDS, cooldown_prefix="cooldown")
 
     @staticmethod
     async def generate_code() -> str:
@@ -75,28 +94,22 @@ class VerificationCodeManager:
 
     @classmethod
     async def set_code(cls, email: str, expiry_seconds: int = 300) -> str:
-        redis = await get_redis()
-        cooldown_key = f"cooldown:{email}"
-        logger.debug(f"Checking cooldown for email: {email}")
-        if await redis.exists(cooldown_key):
+        code = await cls.generate_code()
+        if not await cls.codes.set(email, code, ttl_seconds=expiry_seconds):
             logger.warning(f"Too many requests for email: {email}")
             raise TooManyRequests("Please wait before requesting another code.")
-
-        code = await cls.generate_code()
-        await redis.setex(f"verify:{email}", expiry_seconds, code)
-        await redis.setex(cooldown_key, COOL_DOWN_SECONDS, "1")
         logger.info(f"Verification code set for {email}")
         return code
 
     @classmethod
     async def get_code(cls, email: str) -> str:
-        redis = await get_redis()
-        code = await redis.get(f"verify:{email}")
+        code = await cls.codes.get(email)
         logger.debug(f"Retrieved verification code for {email}: {code}")
         return code
 
     @classmethod
-    async def delete_code(cls, email: str):
-        redis = await get_redis()
-        await redis.delete(f"verify:{email}")
-        logger.info(f"Deleted verification code for {email}")
+    async def consume_code(cls, email: str, code: str) -> bool:
+        """Checks and deletes the code in one step; a code verifies at most once."""
+        consumed = await cls.codes.consume(email, code)
+        logger.info(f"Verification code for {email} {'consumed' if consumed else 'rejected'}")
+        return consumed
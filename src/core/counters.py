@@ -0,0 +1,115 @@
+import asyncio
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Dict, Optional, Union
+
+from loguru import logger
+from sqlalchemy import Column, Table, column, update, values
+
+from src.core.settings import settings
+from src.db.database import AsyncSession as SessionFactory
+
+Step = Union[int, Decimal]
+
+
+class CounterBuffer:
+    """
+    Coalesces counter increments in memory and writes them as one UPDATE per table.
+
+    Requests only touch a dict; every `flush_interval` seconds the pending steps are
+    summed per row and applied with `UPDATE t SET f = t.f + v.step FROM (VALUES ...) v`.
+    A failed flush puts its steps back for the next one. Steps still pending when the
+    process dies hard are lost, so this is for statistics, not balances.
+    """
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._pending: Dict[Column, Dict[Any, Step]] = defaultdict(lambda: defaultdict(int))
+        self._task: Optional[asyncio.Task] = None
+
+        self.added = 0
+        self.flushed_rows = 0
+        self.failed_flushes = 0
+
+    def add(self, counter: Column, obj_id: Any, step: Step = 1):
+        self._pending[counter][obj_id] += step
+        self.added += 1
+
+    def _merge(self, pending: Dict[Column, Dict[Any, Step]]):
+        for counter, steps in pending.items():
+            for obj_id, step in steps.items():
+                self._pending[counter][obj_id] += step
+
+    @staticmethod
+    def _update_statement(table: Table, counters: Dict[Column, Dict[Any, Step]]):
+        fields = list(counters)
+        # Sabit sıra: aynı satırları güncelleyen iki worker birbirini kilitlemesin
+        ids = sorted({obj_id for steps in counters.values() for obj_id in steps}, key=str)
+        steps = values(
+            column("id", table.c.id.type),
+            *(column(f"step_{i}", field.type) for i, field in enumerate(fields)),
+            name="steps",
+        ).data([(obj_id, *(counters[field].get(obj_id, 0) for field in fields)) for obj_id in ids])
+        return (
+            update(table)
+            .where(table.c.id == steps.c.id)
+            .values({field.name: field + steps.c[f"step_{i}"] for i, field in enumerate(fields)})
+        )
+
+    async def flush(self) -> int:
+        """Writes every pending step; returns the number of rows updated."""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, defaultdict(lambda: defaultdict(int))
+
+        by_table: Dict[Table, Dict[Column, Dict[Any, Step]]] = defaultdict(dict)
+        for counter, steps in pending.items():
+            by_table[counter.table][counter] = steps
+
+        rows = 0
+        try:
+            async with SessionFactory() as session:
+                for table, counters in by_table.items():
+                    result = await session.execute(self._update_statement(table, counters))
+                    rows += result.rowcount
+                await session.commit()
+        except Exception:
+            logger.exception("Counter flush failed; steps kept for the next flush")
+            self._merge(pending)
+            self.failed_flushes += 1
+            return 0
+
+        self.flushed_rows += rows
+        return rows
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops the periodic flush and writes whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending_rows": sum(len(steps) for steps in self._pending.values()),
+            "added": self.added,
+            "flushed_rows": self.flushed_rows,
+            "failed_flushes": self.failed_flushes,
+            "flush_interval_seconds": self.flush_interval,
+        }
+
+
+counter_buffer = CounterBuffer(flush_interval=settings.COUNTER_FLUSH_INTERVAL)
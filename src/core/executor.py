@@ -0,0 +1,81 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from loguru import logger
+from src.errors import TooManyRequests
+
+
+class BoundedExecutor:
+    """
+    Runs blocking, CPU-heavy callables on a private thread pool so they don't stall the event loop.
+
+    At most `max_workers` jobs run at once and at most `max_pending` wait for a
+    thread; anything beyond that is rejected with TooManyRequests instead of
+    piling up unbounded latency.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.in_flight = 0  # running + waiting for a thread
+        self.max_in_flight = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._pool
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        if self.in_flight >= self.max_workers + self.max_pending:
+            self.rejected += 1
+            logger.warning(f"[{self.name}] executor saturated, rejecting job")
+            raise TooManyRequests()
+
+        def job():
+            return time.perf_counter(), fn(*args)
+
+        submitted_at = time.perf_counter()
+        self.submitted += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            started_at, result = await asyncio.get_running_loop().run_in_executor(self._get_pool(), job)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+
+        # time spent queued behind other jobs, not hashing
+        wait = started_at - submitted_at
+        self.total_wait_seconds += wait
+        self.max_wait_seconds = max(self.max_wait_seconds, wait)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "in_flight": self.in_flight,
+            "queued": max(0, self.in_flight - self.max_workers),
+            "max_in_flight": self.max_in_flight,
+            "avg_wait_ms": round(1000 * self.total_wait_seconds / self.completed, 3) if self.completed else 0.0,
+            "max_wait_ms": round(1000 * self.max_wait_seconds, 3),
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
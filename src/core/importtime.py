@@ -0,0 +1,60 @@
+"""
+Import-time report for the API entrypoint.
+
+    python -m src.core.importtime [module] [--top 25]
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter and lists the
+modules with the largest cumulative import time, so slow imports on the boot path are
+easy to spot before they reach an autoscaled worker.
+"""
+import argparse
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import List, Tuple
+
+DEFAULT_MODULE = "main"
+
+
+@dataclass
+class ImportEntry:
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def profile_import(module: str = DEFAULT_MODULE) -> Tuple[float, List[ImportEntry]]:
+    """Returns (cumulative ms of `module`, every imported module) from a cold interpreter."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append(ImportEntry(name.strip(), int(self_us), int(cumulative_us)))
+
+    total = next((e.cumulative_us for e in reversed(entries) if e.module == module), 0)
+    return total / 1000, entries
+
+
+def format_report(total_ms: float, entries: List[ImportEntry], top: int = 25) -> str:
+    lines = [f"total: {total_ms:.1f} ms across {len(entries)} modules", ""]
+    lines.append(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for entry in sorted(entries, key=lambda e: e.cumulative_us, reverse=True)[:top]:
+        lines.append(f"{entry.cumulative_us / 1000:>14.1f} {entry.self_us / 1000:>9.1f}  {entry.module}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time report")
+    parser.add_argument("module", nargs="?", default=DEFAULT_MODULE)
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+    print(format_report(*profile_import(args.module), top=args.top))
@@ -1,4 +1,10 @@
+import asyncio
+import json
+import time
+from typing import Callable, Optional, Set
+
 import redis.asyncio as redis
+from loguru import logger
 from src.core.settings import settings
 
 class RedisManager:
@@ -64,7 +70,9 @@ class TokenBlocklist:
         Adds a JWT token to the blocklist using JTI with an expiry time.
         """
         client = await RedisManager.get_client()
-        await client.setex(name=jti, value="", ex=expiry_seconds)
+        await client.setex(name=jti, time=expiry_seconds, value="")
+        # Let every worker drop the token from its local cache right away
+        await revocation_channel.publish({"jti": jti, "expires_at": time.time() + expiry_seconds})
 
     @staticmethod
     async def is_token_blacklisted(jti: str) -> bool:
@@ -72,4 +80,168 @@ class TokenBlocklist:
         Checks if a JWT token is blacklisted using JTI.
         """
         client = await RedisManager.get_client()
-        return await client.exists(jti) > 0
\ No newline at end of file
+        return await client.exists(jti) > 0
+
+
+# Cooldown boşsa alır ve değeri yazar; kontrol ile yazma arasında başka istek giremez
+SET_WITH_COOLDOWN = """
+if not redis.call('SET', KEYS[2], '1', 'NX', 'EX', ARGV[3]) then return 0 end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+
+# Değer eşleşirse siler; aynı değer yalnızca bir kez kabul edilir
+CONSUME_IF_EQUAL = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+
+
+class RateLimitedKey:
+    """
+    A short-lived value per subject (e.g. a verification code per email) that can be
+    rewritten at most once every `cooldown_seconds`.
+
+    `set` takes the cooldown key with SET NX EX and writes the value in one script,
+    so two concurrent requests can never both pass the cooldown. `consume` compares
+    and deletes in one step, so a value is accepted at most once and a wrong guess
+    leaves it in place. Each call is a single round trip.
+    """
+
+    def __init__(self, prefix: str, ttl_seconds: int, cooldown_seconds: int, cooldown_prefix: Optional[str] = None):
+        self.prefix = prefix
+        self.cooldown_prefix = cooldown_prefix or f"{prefix}:cooldown"
+        self.ttl_seconds = ttl_seconds
+        self.cooldown_seconds = cooldown_seconds
+
+    def key(self, subject: str) -> str:
+        return f"{self.prefix}:{subject}"
+
+    def cooldown_key(self, subject: str) -> str:
+        return f"{self.cooldown_prefix}:{subject}"
+
+    async def set(self, subject: str, value: str, ttl_seconds: Optional[int] = None, redis=None) -> bool:
+        """Stores the value; returns False without writing while the subject is cooling down."""
+        client = redis or await RedisManager.get_client()
+        stored = await client.eval(
+            SET_WITH_COOLDOWN, 2, self.key(subject), self.cooldown_key(subject),
+            value, ttl_seconds or self.ttl_seconds, self.cooldown_seconds,
+        )
+        return stored == 1
+
+    async def get(self, subject: str, redis=None) -> Optional[str]:
+        client = redis or await RedisManager.get_client()
+        return await client.get(self.key(subject))
+
+    async def consume(self, subject: str, value: str, redis=None) -> bool:
+        """Deletes the value if it equals `value`; True only for the one caller that removed it."""
+        client = redis or await RedisManager.get_client()
+        return await client.eval(CONSUME_IF_EQUAL, 1, self.key(subject), value) == 1
+
+
+class PubSubChannel:
+    """
+    A Redis pub/sub channel shared by every API worker.
+
+    Each process keeps a single subscription open and fans incoming messages
+    out to local asyncio queues, so a hundred websockets cost one Redis connection.
+    """
+
+    RESYNC = {"type": "resync"}
+
+    def __init__(self, name: str, queue_size: int = 256):
+        self.name = name
+        self.queue_size = queue_size
+        self._queues: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._subscribed = asyncio.Event()
+
+    @property
+    def is_subscribed(self) -> bool:
+        return self._subscribed.is_set()
+
+    async def publish(self, message: dict):
+        """Publishes a JSON message to every subscriber in every worker."""
+        client = await RedisManager.get_client()
+        await client.publish(self.name, json.dumps(message, default=str))
+
+    async def subscribe(self) -> asyncio.Queue:
+        """Returns a queue that receives every message published from now on."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._queues.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+        try:
+            await asyncio.wait_for(self._subscribed.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            logger.warning(f"Subscription to '{self.name}' is not ready yet")
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._queues.discard(queue)
+
+    def _dispatch(self, message: dict):
+        for queue in list(self._queues):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Slow consumer: drop its backlog and ask it to reload from scratch
+                logger.warning(f"Subscriber on '{self.name}' fell behind, forcing resync")
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self.RESYNC)
+
+    async def _listen(self):
+        reconnecting = False
+        while True:
+            pubsub = None
+            try:
+                client = await RedisManager.get_client()
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(self.name)
+                self._subscribed.set()
+                if reconnecting:
+                    # Messages published while we were disconnected are lost
+                    self._dispatch(self.RESYNC)
+                while True:
+                    # Poll with a timeout: a blocking read would trip the client's socket_timeout
+                    raw = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if raw is not None:
+                        self._dispatch(json.loads(raw["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Lost subscription to '{self.name}': {e}")
+                self._subscribed.clear()
+                reconnecting = True
+                await asyncio.sleep(1)
+            finally:
+                if pubsub is not None:
+                    await pubsub.aclose()
+
+    async def consume(self, on_message: Callable[[dict], None], on_resync: Callable[[], None]):
+        """Feeds every message to `on_message` until cancelled; `on_resync` runs when messages may have been lost."""
+        queue = await self.subscribe()
+        try:
+            while True:
+                message = await queue.get()
+                if message == self.RESYNC:
+                    on_resync()
+                else:
+                    on_message(message)
+        finally:
+            self.unsubscribe(queue)
+
+    async def close(self):
+        """Stops the background subscription of this process."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._subscribed.clear()
+
+
+revocation_channel = PubSubChannel("auth:revocations")
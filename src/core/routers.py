@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends
+
+from src.auth.utils import password_executor
+from src.core.counters import counter_buffer
+from src.db.database import get_pool_status
+from src.events.handlers import pipeline_stats
+from src.mail.queue import mail_queue
+from src.user.dependencies import get_current_admin
+
+# Havuz, kuyruk ve işlem hacmi iç bilgilerdir; yalnızca yöneticiler görür
+router = APIRouter(prefix="/metrics", tags=["Metrics"], dependencies=[Depends(get_current_admin)])
+
+
+@router.get("/password-hashing")
+async def password_hashing_stats():
+    """Queue and wait-time metrics of the password hashing pool."""
+    return password_executor.stats()
+
+
+@router.get("/db-pool")
+async def db_pool_stats():
+    """Checked-out connections, overflow and checkout wait time of the database pool."""
+    return get_pool_status()
+
+
+@router.get("/counters")
+async def counter_buffer_stats():
+    """Pending and flushed increments of the stats counter buffer."""
+    return counter_buffer.stats()
+
+
+@router.get("/events")
+async def event_pipeline_stats():
+    """Published outbox events and handled/failed/dropped events per consumer group."""
+    return pipeline_stats()
+
+
+@router.get("/mail")
+async def mail_queue_stats():
+    """Sent, retried and dropped messages and the SMTP connection of this worker's mail dispatcher."""
+    return mail_queue.stats()
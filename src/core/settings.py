@@ -6,6 +6,15 @@ class Settings(BaseSettings):
     DATABASE_PASSWORD: str
     DATABASE_NAME: str
     DATABASE_USERNAME: str
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 15000
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    DB_ECHO: bool = False
+    DB_SQL_COUNT_HEADER: bool = False
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXP_MIN: int
@@ -21,8 +30,26 @@ class Settings(BaseSettings):
     MAIL_PORT: int
     MAIL_SERVER: str
     MAIL_FROM_NAME: str
+    MAIL_STARTTLS: bool = True
+    MAIL_USE_CREDENTIALS: bool = True
+    MAIL_BATCH_SIZE: int = 50
+    MAIL_MAX_ATTEMPTS: int = 5
+    MAIL_RETRY_BASE_SECONDS: float = 5.0
     FERNET_KEY: str
     TOKEN_BLOCK_LIST_EXPIRY: int
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    TOKEN_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL: int = 300
+    WAITER_ASSIGNMENT_STRATEGY: str = "least_loaded"
+    WAITER_ROSTER_TTL: int = 300
+    FLOOR_STATE_TTL: int = 300
+    COUNTER_FLUSH_INTERVAL: float = 5.0
+    EVENT_POLL_INTERVAL: float = 1.0
+    OUTBOX_BATCH_SIZE: int = 200
+    EVENT_STREAM_MAXLEN: int = 100000
+    EVENT_MAX_DELIVERIES: int = 5
+    SEED_ON_STARTUP: bool = True
 
     class Config:
         env_file = ".env"
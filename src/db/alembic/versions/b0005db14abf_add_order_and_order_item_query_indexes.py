@@ -0,0 +1,41 @@
+"""add order and order item query indexes
+
+Revision ID: b0005db14abf
+Revises: 10919a55639c
+Create Date: 2026-10-18 01:59:44.781040
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b0005db14abf'
+down_revision: Union[str, None] = '10919a55639c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Sıcak tablolar: index'ler yazmaları kilitlemeden, transaction dışında kurulur
+    with op.get_context().autocommit_block():
+        op.create_index('ix_order_customer_created', 'order', ['customer_id', 'created_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_order_kitchen_active', 'order', ['created_at'], unique=False, postgresql_where=sa.text("status IN ('IN_PROGRESS', 'READY')"), postgresql_concurrently=True)
+        op.create_index('ix_order_table_created', 'order', ['table_id', 'created_at'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_order_waiter_created', 'order', ['waiter_id', 'created_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_order_item_order_id', 'order_item', ['order_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_payment_successful_created', 'payment', ['created_at', 'id'], unique=False, postgresql_where=sa.text('is_successful'), postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_payment_successful_created', table_name='payment', postgresql_concurrently=True)
+        op.drop_index('ix_order_item_order_id', table_name='order_item', postgresql_concurrently=True)
+        op.drop_index('ix_order_waiter_created', table_name='order', postgresql_concurrently=True)
+        op.drop_index('ix_order_table_created', table_name='order', postgresql_concurrently=True)
+        op.drop_index('ix_order_kitchen_active', table_name='order', postgresql_concurrently=True)
+        op.drop_index('ix_order_customer_created', table_name='order', postgresql_concurrently=True)
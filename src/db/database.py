@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy import  Boolean, UUID
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.sql.expression import text
@@ -7,13 +8,79 @@ from sqlalchemy.sql.sqltypes import TIMESTAMP
 from sqlalchemy.orm import  as_declarative, declared_attr, Mapped, mapped_column
 from src.core.settings import settings
 from datetime import datetime
+import time
 import uuid
 
 DATABASE_URL = f'postgresql+asyncpg://{settings.DATABASE_USERNAME}:{settings.DATABASE_PASSWORD}@{settings.DATABASE_HOSTNAME}:{settings.DATABASE_PORT}/{settings.DATABASE_NAME}'
 
-async_engine = create_async_engine(DATABASE_URL)
+
+class PoolStats:
+    """Counters filled in by InstrumentedPool; survive pool re-creation on dispose()."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(1000 * self.total_wait_seconds / self.checkouts, 3) if self.checkouts else 0.0,
+            "max_wait_ms": round(1000 * self.max_wait_seconds, 3),
+        }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long callers wait for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        wait = time.perf_counter() - started
+        pool_stats.checkouts += 1
+        pool_stats.total_wait_seconds += wait
+        pool_stats.max_wait_seconds = max(pool_stats.max_wait_seconds, wait)
+        return connection
+
+
+async_engine = create_async_engine(
+    DATABASE_URL,
+    poolclass=InstrumentedPool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    echo=settings.DB_ECHO,
+    connect_args={
+        "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+        "server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)},
+    },
+)
 AsyncSession = async_sessionmaker(autocommit=False, autoflush=False, bind=async_engine)
 
+
+def get_pool_status() -> dict:
+    """Live pool gauges plus the cumulative checkout/wait counters."""
+    pool = async_engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        **pool_stats.as_dict(),
+    }
+
 @as_declarative()
 class Base():
     __allow_unmapped__ = True  # Allow unmapped attributes
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Session
-from db.database import AsyncSession
+from src.db.database import AsyncSession
 
 async def get_db():
     """Dependency for FastAPI routes to use the database session."""
@@ -0,0 +1,21 @@
+"""
+Named loader profiles.
+
+Every relationship in src/db/models.py is `lazy="raise"`, so a query loads only the
+columns of the entity it selects. A repository that needs related rows passes one of
+these profiles as query options:
+
+    select(Order).where(...).options(*ORDER_SUMMARY)
+
+Collections use selectinload: one extra IN query per collection, no row fan-out and
+no `.unique()` on the result.
+"""
+from sqlalchemy.orm import selectinload
+
+from src.db.models import Order
+
+# OrderResponse: the order columns and its lines
+ORDER_SUMMARY = (
+    selectinload(Order.items),
+)
+
@@ -10,17 +10,26 @@ from sqlalchemy import (
     Boolean,
     CheckConstraint,
     Column,
+    Computed,
     Date,
     Enum as SQLAlchemyEnum,
     ForeignKey,
+    Index,
     Integer,
     Numeric,
     String,
     Table,
+    TIMESTAMP,
+    text,
+    UniqueConstraint,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from src.db.database import Base 
+from src.db.database import Base
+
+# İlişkiler varsayılan olarak yüklenmez (lazy="raise"): erişilen her ilişki sorguda
+# src/db/loaders.py'deki bir profille açıkça istenmeli, yoksa hata verir.
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Helpers & look‑ups
@@ -85,15 +94,19 @@ class Waiter(User):
     id: Mapped[UUID] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
     birth_date: Mapped[date] = mapped_column(Date)
 
+    # istatistik sayaçları — CounterBuffer toplu olarak artırır
+    total_orders_taken: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    total_tables_served: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
     tables: Mapped[List["RestaurantTable"]] = relationship(
         secondary=waiter_table_link,
         back_populates="waiters",
-        lazy="selectin",
+        lazy="raise",
     )
 
     orders: Mapped[List["Order"]] = relationship(
         back_populates="waiter",
-        lazy="selectin",
+        lazy="raise",
         foreign_keys="[Order.waiter_id]",
     )
 
@@ -109,15 +122,20 @@ class Customer(User):
         ForeignKey("restaurant_table.id", ondelete="SET NULL"), nullable=True
     )
 
+    total_visits: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    total_amount_spent: Mapped[Decimal] = mapped_column(
+        Numeric(12, 2), nullable=False, default=Decimal("0"), server_default="0"
+    )
+
     table: Mapped[Optional["RestaurantTable"]] = relationship(
         back_populates="customers",
         foreign_keys="[Customer.table_id]",
-        lazy="selectin",
+        lazy="raise",
     )
 
     orders: Mapped[List["Order"]] = relationship(
         back_populates="customer",
-        lazy="selectin",
+        lazy="raise",
         foreign_keys="[Order.customer_id]",
     )
 
@@ -129,10 +147,11 @@ class KitchenStaff(User):
 
     id: Mapped[UUID] = mapped_column(ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
     station: Mapped[str] = mapped_column(String(32))
+    total_orders_prepared: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
 
     orders: Mapped[List["Order"]] = relationship(
         back_populates="kitchen_staff",
-        lazy="selectin",
+        lazy="raise",
         foreign_keys="[Order.kitchen_staff_id]",
     )
 
@@ -167,52 +186,65 @@ class Order(Base):
     )
     special_request: Mapped[Optional[str]] = mapped_column(String(255))
     total_amount: Mapped[Decimal] = mapped_column(Numeric(10, 2), default=Decimal("0"))
+    # Başarılı ödemelerin toplamı; SettlementEngine ödeme yazarken sipariş kilitliyken günceller
+    paid_amount: Mapped[Decimal] = mapped_column(Numeric(10, 2), default=Decimal("0"), server_default="0")
+    balance_due: Mapped[Decimal] = mapped_column(
+        Numeric(10, 2), Computed("total_amount - paid_amount", persisted=True)
+    )
     is_paid: Mapped[bool] = mapped_column(Boolean, default=False)
 
     # relationships
     customer: Mapped[Optional["Customer"]] = relationship(
         back_populates="orders",
-        lazy="selectin",
+        lazy="raise",
         foreign_keys=[customer_id],
     )
     waiter: Mapped[Optional["Waiter"]] = relationship(
         back_populates="orders",
-        lazy="selectin",
+        lazy="raise",
         foreign_keys=[waiter_id],
     )
     kitchen_staff: Mapped[Optional["KitchenStaff"]] = relationship(
         back_populates="orders",
-        lazy="selectin",
+        lazy="raise",
         foreign_keys=[kitchen_staff_id],
     )
     table: Mapped[Optional["RestaurantTable"]] = relationship(
         back_populates="orders",
-        lazy="selectin",
+        lazy="raise",
         foreign_keys=[table_id],
     )
 
     items: Mapped[List["OrderItem"]] = relationship(
         back_populates="order",
         cascade="all, delete-orphan",
-        lazy="joined",
+        lazy="raise",
         foreign_keys="[OrderItem.order_id]",
     )
     payments: Mapped[List["Payment"]] = relationship(
         back_populates="order",
         cascade="all, delete-orphan",
         foreign_keys="[Payment.order_id]",
-        lazy="selectin",
+        lazy="raise",
     )
 
 
     __table_args__ = (
         CheckConstraint("total_amount >= 0", name="ck_order_total_nonnegative"),
+        # close_table'ın açık sipariş kontrolü: masanın geçmiş siparişleri taranmaz
+        Index("ix_order_table_unpaid", "table_id", postgresql_where=text("NOT is_paid")),
+        # garson / müşteri listeleri (created_at, id) keyset sırasıyla sayfalanır
+        Index("ix_order_waiter_created", "waiter_id", "created_at", "id"),
+        Index("ix_order_customer_created", "customer_id", "created_at", "id"),
+        # kat planı: masanın en son siparişi
+        Index("ix_order_table_created", "table_id", "created_at"),
+        # mutfak ekranı; status isimle saklanır (native_enum=False)
+        Index(
+            "ix_order_kitchen_active", "created_at",
+            postgresql_where=text("status IN ('IN_PROGRESS', 'READY')"),
+        ),
     )
 
-    # Helper – keep running total correct
-    def recalc_total(self) -> None:
-        self.total_amount = sum(item.line_total for item in self.items)
-
 
 class OrderItem(Base):
     __tablename__ = "order_item"
@@ -231,15 +263,17 @@ class OrderItem(Base):
 
     order: Mapped["Order"] = relationship(
         back_populates="items",
+        lazy="raise",
         foreign_keys=[order_id],
     )
     menu_item: Mapped[Optional["MenuItem"]] = relationship(
         back_populates="order_items",
-        lazy="joined",
+        lazy="raise",
         foreign_keys=[menu_item_id],
     )
     
     __table_args__ = (
+        Index("ix_order_item_order_id", "order_id"),
         CheckConstraint("quantity >= 1", name="ck_item_qty_positive"),
         CheckConstraint("unit_price >= 0", name="ck_item_price_nonnegative"),
     )
@@ -267,7 +301,7 @@ class MenuCategory(Base):
 
     items: Mapped[List["MenuItem"]] = relationship(
         back_populates="category",
-        lazy="selectin",
+        lazy="raise",
         foreign_keys="[MenuItem.category_id]",
     )
 
@@ -286,12 +320,12 @@ class MenuItem(Base):
 
     category: Mapped[Optional["MenuCategory"]] = relationship(
         back_populates="items",
-        lazy="joined",
+        lazy="raise",
         foreign_keys=[category_id],
     )
     order_items: Mapped[List["OrderItem"]] = relationship(
         back_populates="menu_item",
-        lazy="selectin",
+        lazy="raise",
         foreign_keys="[OrderItem.menu_item_id]",
     )
 
@@ -324,27 +358,27 @@ class RestaurantTable(Base):
     customers: Mapped[List["Customer"]] = relationship(
         back_populates="table",
         foreign_keys="[Customer.table_id]",
-        lazy="joined",
+        lazy="raise",
     )
 
     # current single occupant (one‑to‑one convenience)
     occupant: Mapped[Optional["Customer"]] = relationship(
         foreign_keys=[occupied_by],
         uselist=False,
-        lazy="joined",
+        lazy="raise",
         post_update=True,  # helps circular FK updates during seat/leave
     )
 
     waiters: Mapped[List["Waiter"]] = relationship(
         secondary=waiter_table_link,
         back_populates="tables",
-        lazy="selectin",
+        lazy="raise",
     )
 
     orders: Mapped[List["Order"]] = relationship(
         back_populates="table",
         foreign_keys="[Order.table_id]",
-        lazy="selectin",
+        lazy="raise",
     )
 
     __table_args__ = (
@@ -380,18 +414,93 @@ class Payment(Base):
     )
     is_successful: Mapped[bool] = mapped_column(Boolean, default=False)
     paid_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    # POS'un Idempotency-Key başlığı; aynı anahtarla tekrar gelen istek yeni ödeme yazmaz
+    idempotency_key: Mapped[Optional[str]] = mapped_column(String(64), unique=True, nullable=True)
 
     # relationships
     order: Mapped["Order"] = relationship(
         back_populates="payments",
         foreign_keys=[order_id],
-        lazy="selectin",
+        lazy="raise",
     )
     customer: Mapped["Customer"] = relationship(
         foreign_keys=[customer_id],
-        lazy="selectin",
+        lazy="raise",
     )
 
     __table_args__ = (
         CheckConstraint("amount >= 0", name="ck_payment_amount_positive"),
+        # siparişin ödemeleri ve ödenen toplam (amount index'ten okunur)
+        Index("ix_payment_order_successful", "order_id", "is_successful", postgresql_include=["amount"]),
+        # müşteri ödemeleri, (created_at, id) keyset sırasıyla
+        Index("ix_payment_customer_created", "customer_id", "created_at", "id"),
+        Index("ix_payment_paid_at_successful", "paid_at", "id", postgresql_where=text("is_successful")),
+        Index("ix_payment_successful_created", "created_at", "id", postgresql_where=text("is_successful")),
+    )
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Sales analytics (pre‑aggregated rollups)
+# ──────────────────────────────────────────────────────────────────────────────
+
+class RollupGranularity(str, Enum):
+    HOUR = "hour"
+    DAY = "day"
+
+
+class RollupDimension(str, Enum):
+    TOTAL = "total"
+    MENU_ITEM = "menu_item"
+    CATEGORY = "category"
+    WAITER = "waiter"
+    TABLE = "table"
+
+
+class SalesRollup(Base):
+    """
+    Revenue counters per (granularity, dimension, bucket).
+
+    Rows are only ever incremented, by the paid transition of an order or by the backfill job;
+    `dimension_id` is the menu item / category / waiter / table id, or the nil UUID for TOTAL.
+    """
+    __tablename__ = "sales_rollup"
+
+    granularity: Mapped[str] = mapped_column(String(8), nullable=False)
+    dimension: Mapped[str] = mapped_column(String(16), nullable=False)
+    dimension_id: Mapped[UUID] = mapped_column(nullable=False)
+    bucket_start: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
+
+    order_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    item_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    revenue: Mapped[Decimal] = mapped_column(Numeric(12, 2), nullable=False, default=Decimal("0"))
+
+    __table_args__ = (
+        UniqueConstraint(
+            "granularity", "dimension", "bucket_start", "dimension_id",
+            name="uq_sales_rollup_bucket",
+        ),
+    )
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Domain events (transactional outbox)
+# ──────────────────────────────────────────────────────────────────────────────
+
+class OutboxEvent(Base):
+    """
+    A domain event written in the same transaction as the change it describes.
+
+    OutboxRelay copies rows to the Redis stream and deletes them, so the table only
+    holds events that are not published yet.
+    """
+    __tablename__ = "outbox_event"
+
+    event_type: Mapped[str] = mapped_column(String(32), nullable=False)
+    aggregate_id: Mapped[UUID] = mapped_column(nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+
+    __table_args__ = (
+        Index("ix_outbox_event_created", "created_at", "id"),
     )
+    # Sunucu varsayılanları geri okunmaz; id istemcide üretilince olaylar RETURNING'siz tek INSERT'te yazılır
+    __mapper_args__ = {"eager_defaults": False}
@@ -0,0 +1,35 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+
+from src.db.database import async_engine
+
+SQL_COUNT_HEADER = "X-SQL-Count"
+
+_statements: ContextVar[Optional[List[str]]] = ContextVar("sql_statements", default=None)
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    statements = _statements.get()
+    if statements is not None:
+        statements.append(statement)
+
+
+@contextmanager
+def capture_statements() -> Iterator[List[str]]:
+    """
+    Collects the SQL sent by the current task (and the tasks it starts) inside the block.
+
+    The list is shared through a context variable, so concurrent requests never see each
+    other's statements. SQLAlchemy runs the sync engine events in a greenlet that inherits
+    the caller's context.
+    """
+    statements: List[str] = []
+    token = _statements.set(statements)
+    try:
+        yield statements
+    finally:
+        _statements.reset(token)
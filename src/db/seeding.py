@@ -0,0 +1,45 @@
+import time
+
+from loguru import logger
+from sqlalchemy import func, select
+
+from src.db.database import AsyncSession
+from src.menu.cache import menu_cache
+from src.menu.seed import seed_menus
+from src.table.floor import floor_state
+from src.table.seed import seed_tables
+
+# pg_advisory_xact_lock anahtarı; aynı anda açılan worker'lardan yalnızca biri seed eder
+SEED_LOCK_KEY = 0x5EED
+
+
+async def run_startup_seeds() -> bool:
+    """
+    Seeds the reference data in one transaction under a transaction-level advisory lock.
+
+    A worker that finds the lock taken skips seeding instead of waiting for it: the holder
+    inserts the same idempotent rows. Returns whether this worker ran the seeds.
+    """
+    started = time.perf_counter()
+    try:
+        async with AsyncSession() as session:
+            locked = (await session.execute(select(func.pg_try_advisory_xact_lock(SEED_LOCK_KEY)))).scalar()
+            if not locked:
+                logger.info("Seeding skipped: another worker holds the seed lock")
+                return False
+            tables = await seed_tables(session)
+            menu = await seed_menus(session)
+            await session.commit()
+    except Exception:
+        logger.exception("Startup seeding failed")
+        return False
+
+    if menu:
+        await menu_cache.bump_version()
+    if tables:
+        await floor_state.invalidate()
+    logger.info(
+        f"Seeding finished in {(time.perf_counter() - started) * 1000:.1f} ms "
+        f"| tables added={tables} | menu rows changed={menu}"
+    )
+    return True
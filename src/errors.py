@@ -68,6 +68,10 @@ class TooManyRequests(Exception):
     """Too many requests"""
     pass
 
+class InvalidCursor(BaseException):
+    """Pagination cursor is malformed or was not issued by this API"""
+    pass
+
 def create_exception_handler(
     status_code: int, initial_detail: Any
 ) -> Callable[[Request, Exception], JSONResponse]:
@@ -189,6 +193,16 @@ def register_all_errors(app: FastAPI):
             },
         ),
     )
+    app.add_exception_handler(
+        InvalidCursor,
+        create_exception_handler(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            initial_detail={
+                "message": "Invalid pagination cursor",
+                "error_code": "invalid_cursor",
+            },
+        ),
+    )
     @app.exception_handler(500)
     async def internal_server_error(request, exc):
 
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import os
+import socket
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from loguru import logger
+from redis.exceptions import ResponseError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.redis_manager import get_redis
+from src.core.settings import settings
+from src.db.database import AsyncSession as SessionFactory
+from src.events.relay import EVENT_STREAM
+
+# Bu kadar süre onaylanmamış mesaj, çöken bir tüketiciden devralınır
+RECLAIM_IDLE_MS = 30000
+
+
+class DomainEvent(NamedTuple):
+    id: str            # outbox satırının id'si; tekrar teslimleri ayırt etmek için
+    type: str
+    aggregate_id: str
+    payload: dict
+
+    @classmethod
+    def from_fields(cls, fields: Dict[str, str]) -> "DomainEvent":
+        return cls(fields["id"], fields["type"], fields["aggregate_id"], json.loads(fields["payload"]))
+
+
+Handler = Callable[[AsyncSession, DomainEvent], Awaitable[None]]
+
+
+class StreamConsumer:
+    """
+    One consumer group on EVENT_STREAM; every group sees every event once.
+
+    The group reads when the local relay has published (`wake`) and every
+    `poll_interval` for events published by other workers, with a non-blocking
+    XREADGROUP, so no Redis connection sits in a blocking read. Events are acknowledged
+    after their handler returns, so a failing handler leaves the event pending. Events pending for RECLAIM_IDLE_MS
+    (failed, or read by a worker that died) are claimed and retried; after
+    EVENT_MAX_DELIVERIES attempts they are logged and acknowledged. Event types without
+    a handler in this group are acknowledged unread, and entries that do not parse
+    are logged, counted as dropped and acknowledged.
+    """
+
+    def __init__(self, group: str, handlers: Dict[str, Handler], poll_interval: float, batch_size: int = 100):
+        self.group = group
+        self.handlers = handlers
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._group_ready = False
+
+        self.handled = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def wake(self):
+        self._wakeup.set()
+
+    async def ensure_group(self, redis=None):
+        """Creates the group at the end of the stream; it sees events published from now on."""
+        redis = redis or await get_redis()
+        try:
+            await redis.xgroup_create(EVENT_STREAM, self.group, id="$", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def _handle(self, redis, messages: List[Tuple[str, Dict[str, str]]]) -> int:
+        done = []
+        async with SessionFactory() as session:
+            for message_id, fields in messages:
+                try:
+                    event = DomainEvent.from_fields(fields)
+                except (KeyError, TypeError, ValueError) as e:
+                    # Bozuk kayıt hiçbir denemede okunamaz; partinin geri kalanını bekletmeden düşür
+                    logger.error(f"Dropping malformed event | group={self.group} | message={message_id} | error={e!r}")
+                    self.dropped += 1
+                    done.append(message_id)
+                    continue
+                handler = self.handlers.get(event.type)
+                try:
+                    if handler is not None:
+                        await handler(session, event)
+                        self.handled += 1
+                except Exception:
+                    logger.exception(f"Event handler failed | group={self.group} | event={event.type} | id={event.id}")
+                    await session.rollback()
+                    self.failed += 1
+                    continue
+                done.append(message_id)
+        if done:
+            await redis.xack(EVENT_STREAM, self.group, *done)
+        return len(done)
+
+    async def consume_once(self, redis=None) -> int:
+        """Handles the next batch of new events; returns how many were read."""
+        redis = redis or await get_redis()
+        response = await redis.xreadgroup(self.group, self.consumer, {EVENT_STREAM: ">"}, count=self.batch_size)
+        messages = response[0][1] if response else []
+        if messages:
+            await self._handle(redis, messages)
+        return len(messages)
+
+    async def reclaim(self, redis=None, min_idle_ms: int = RECLAIM_IDLE_MS) -> int:
+        """Retries events left pending for `min_idle_ms`; returns how many were acknowledged."""
+        redis = redis or await get_redis()
+        pending = await redis.xpending_range(
+            EVENT_STREAM, self.group, min="-", max="+", count=self.batch_size, idle=min_idle_ms
+        )
+        if not pending:
+            return 0
+        dead = [entry["message_id"] for entry in pending if entry["times_delivered"] >= settings.EVENT_MAX_DELIVERIES]
+        if dead:
+            logger.error(f"Dropping events after {settings.EVENT_MAX_DELIVERIES} attempts | group={self.group} | ids={dead}")
+            await redis.xack(EVENT_STREAM, self.group, *dead)
+            self.dropped += len(dead)
+        retry = [entry["message_id"] for entry in pending if entry["message_id"] not in dead]
+        if not retry:
+            return len(dead)
+        claimed = await redis.xclaim(EVENT_STREAM, self.group, self.consumer, min_idle_ms, retry)
+        # Akıştan budanmış (MAXLEN) mesajların alanı kalmaz
+        return len(dead) + await self._handle(redis, [message for message in claimed if message[1]])
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_reclaim = 0.0
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                if not self._group_ready:
+                    await self.ensure_group()
+                    self._group_ready = True
+                if loop.time() >= next_reclaim:
+                    await self.reclaim()
+                    next_reclaim = loop.time() + RECLAIM_IDLE_MS / 1000
+                while await self.consume_once() == self.batch_size:
+                    pass
+            except Exception as e:
+                logger.error(f"Event consumer '{self.group}' failed: {e}")
+                if "NOGROUP" in str(e):
+                    # Akış ya da grup silinmiş; bir sonraki turda yeniden kurulur
+                    self._group_ready = False
+
+    async def start(self):
+        if self._task is None:
+            try:
+                await self.ensure_group()
+                self._group_ready = True
+            except Exception as e:
+                # Redis hazır değilse grup döngüde kurulur
+                logger.error(f"Event consumer '{self.group}' could not create its group: {e}")
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {"handled": self.handled, "failed": self.failed, "dropped": self.dropped}
@@ -0,0 +1,115 @@
+"""
+Consumer groups of the domain event stream and what each does with an event.
+
+    notifications  kitchen screens, payment receipts
+    analytics      waiter/kitchen/customer stats counters
+    cache          live floor board rows
+
+Delivery is at least once: a redelivered event can count a stat twice, which the
+counters tolerate; the floor board re-reads the table, so repeats do not change it.
+"""
+from decimal import Decimal
+from uuid import UUID
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.settings import settings
+from src.events.consumers import DomainEvent, StreamConsumer
+from src.events.relay import outbox_relay
+from src.mail.mail import EmailSchema
+from src.mail.queue import mail_queue
+from src.table.floor import floor_state
+from src.user.repositories import CustomerRepository, KitchenStaffRepository, WaiterRepository
+from order.events import notify_kitchen
+
+ORDER_EVENTS = ("order.created", "order.accepted", "order.ready", "order.served", "order.canceled")
+
+
+async def send_receipt(session: AsyncSession, event: DomainEvent):
+    if not event.payload.get("customer_id"):
+        return
+    customer = await CustomerRepository(session).get_by_id(event.payload["customer_id"])
+    if customer is None:
+        return
+    await mail_queue.enqueue(EmailSchema(
+        email=customer.primary_email,
+        subject="Ödemeniz alındı",
+        body=f"Siparişinizin {event.payload['total_amount']} TL tutarındaki ödemesi tamamlandı. Teşekkür ederiz!",
+    ))
+
+
+async def count_order_taken(session: AsyncSession, event: DomainEvent):
+    waiter_id = event.payload["order"]["waiter_id"]
+    if waiter_id:
+        WaiterRepository(session).record_order_taken(UUID(waiter_id))
+
+
+async def count_order_prepared(session: AsyncSession, event: DomainEvent):
+    if event.payload.get("kitchen_staff_id"):
+        KitchenStaffRepository(session).record_order_prepared(UUID(event.payload["kitchen_staff_id"]))
+
+
+async def count_spent(session: AsyncSession, event: DomainEvent):
+    if event.payload.get("customer_id"):
+        CustomerRepository(session).record_spent(UUID(event.payload["customer_id"]), Decimal(event.payload["total_amount"]))
+
+
+async def count_visit(session: AsyncSession, event: DomainEvent):
+    if event.payload.get("customer_id"):
+        CustomerRepository(session).record_visit(UUID(event.payload["customer_id"]))
+
+
+async def refresh_floor(session: AsyncSession, event: DomainEvent):
+    if event.type.startswith("table."):
+        table_id = event.aggregate_id
+    elif "order" in event.payload:
+        table_id = event.payload["order"]["table_id"]
+    else:
+        table_id = event.payload["table_id"]
+    await floor_state.refresh(session, table_id)
+
+
+notifications = StreamConsumer("notifications", poll_interval=settings.EVENT_POLL_INTERVAL, handlers={
+    **{event_type: notify_kitchen for event_type in ORDER_EVENTS},
+    "order.paid": send_receipt,
+})
+
+analytics = StreamConsumer("analytics", poll_interval=settings.EVENT_POLL_INTERVAL, handlers={
+    "order.created": count_order_taken,
+    "order.ready": count_order_prepared,
+    "order.paid": count_spent,
+    "table.closed": count_visit,
+})
+
+# Masanın satırını değiştiren olaylar: açık sipariş sayısı/tutarı, garson, doluluk, masa bilgileri
+FLOOR_EVENTS = ("order.created", "order.accepted", "order.canceled", "order.paid", "table.closed", "table.saved")
+
+cache = StreamConsumer("cache", poll_interval=settings.EVENT_POLL_INTERVAL, handlers={
+    event_type: refresh_floor for event_type in FLOOR_EVENTS
+})
+
+CONSUMERS = (notifications, analytics, cache)
+
+
+async def start_event_pipeline():
+    # Gruplar relay'den önce kurulur; "$" ile oluşan grup önceki olayları görmez
+    for consumer in CONSUMERS:
+        await consumer.start()
+        outbox_relay.on_published(consumer.wake)
+    outbox_relay.start()
+    logger.info(f"Event pipeline started | groups={[consumer.group for consumer in CONSUMERS]}")
+
+
+async def stop_event_pipeline():
+    # Yayınlanmamış olaylar outbox'ta kalır, bir sonraki relay turu yayınlar
+    await outbox_relay.stop()
+    for consumer in CONSUMERS:
+        await consumer.stop()
+
+
+def pipeline_stats() -> dict:
+    return {
+        "relay": outbox_relay.stats(),
+        "consumers": {consumer.group: consumer.stats() for consumer in CONSUMERS},
+    }
@@ -0,0 +1,118 @@
+import asyncio
+import json
+from typing import Callable, List, Optional
+
+from loguru import logger
+from sqlalchemy import func, select
+
+from src.core.redis_manager import get_redis
+from src.core.settings import settings
+from src.db.database import AsyncSession as SessionFactory
+from src.events.repositories import OutboxRepository
+
+EVENT_STREAM = "events:domain"
+
+# pg_try_advisory_xact_lock anahtarı; aynı anda yalnızca bir worker yayınlar
+RELAY_LOCK_KEY = 0x0E7B0C5
+
+
+class OutboxRelay:
+    """
+    Copies committed outbox rows to the EVENT_STREAM Redis stream.
+
+    Services write OutboxEvent rows in the transaction of their change and call `wake`
+    after the commit; the relay then publishes right away instead of waiting for the
+    next `poll_interval`, which only picks up events of other workers or failed rounds.
+    Each round holds a transaction-level advisory lock, so one worker publishes at a
+    time, oldest created_at first. created_at is the writer's transaction start, not
+    its commit, so a long transaction that commits after a later one was relayed is
+    published after it: the stream is not in commit order and consumers must not
+    rely on cross-transaction order. Rows are deleted once XADD succeeded; a crash
+    between the two publishes them again, so consumers must tolerate duplicates.
+    """
+
+    def __init__(self, poll_interval: float, batch_size: int):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self._wakeup = asyncio.Event()
+        self._listeners: List[Callable[[], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+        self.published = 0
+        self.failed_rounds = 0
+
+    def wake(self):
+        self._wakeup.set()
+
+    def on_published(self, listener: Callable[[], None]):
+        """Registers a callback run after each round that published events (e.g. a consumer's `wake`)."""
+        self._listeners.append(listener)
+
+    @staticmethod
+    def _fields(event) -> dict:
+        return {
+            "id": str(event.id),
+            "type": event.event_type,
+            "aggregate_id": str(event.aggregate_id),
+            "payload": json.dumps(event.payload),
+            "created_at": event.created_at.isoformat(),
+        }
+
+    async def relay_once(self, redis=None) -> int:
+        """Publishes up to `batch_size` events; returns how many (0 if another worker holds the lock)."""
+        redis = redis or await get_redis()
+        async with SessionFactory() as session:
+            locked = (await session.execute(select(func.pg_try_advisory_xact_lock(RELAY_LOCK_KEY)))).scalar()
+            if not locked:
+                return 0
+            repo = OutboxRepository(session)
+            events = await repo.get_unpublished(self.batch_size)
+            if not events:
+                return 0
+            async with redis.pipeline(transaction=False) as pipe:
+                for event in events:
+                    pipe.xadd(EVENT_STREAM, self._fields(event), maxlen=settings.EVENT_STREAM_MAXLEN, approximate=True)
+                await pipe.execute()
+            await repo.delete_published([event.id for event in events])
+            await session.commit()
+        self.published += len(events)
+        for listener in self._listeners:
+            listener()
+        return len(events)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                while await self.relay_once() == self.batch_size:
+                    pass
+            except Exception:
+                logger.exception("Outbox relay round failed; events stay in the outbox")
+                self.failed_rounds += 1
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "published": self.published,
+            "failed_rounds": self.failed_rounds,
+            "poll_interval_seconds": self.poll_interval,
+        }
+
+
+outbox_relay = OutboxRelay(poll_interval=settings.EVENT_POLL_INTERVAL, batch_size=settings.OUTBOX_BATCH_SIZE)
@@ -0,0 +1,34 @@
+from decimal import Decimal
+from typing import List
+from uuid import UUID, uuid4
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import OutboxEvent
+from src.utils.base_repository import BaseRepository
+
+
+class OutboxRepository(BaseRepository[OutboxEvent]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(OutboxEvent, session)
+
+    def add(self, event_type: str, aggregate_id: UUID, payload: dict):
+        """Queues the event on the session; it is inserted by the caller's commit, or not at all."""
+        # id istemcide üretilir, bkz. OutboxEvent.__mapper_args__
+        self.session.add(OutboxEvent(
+            id=uuid4(),
+            event_type=event_type,
+            aggregate_id=aggregate_id,
+            payload=jsonable_encoder(payload, custom_encoder={Decimal: str}),
+        ))
+
+    async def get_unpublished(self, limit: int) -> List[OutboxEvent]:
+        """Oldest first by created_at (transaction start), which is not commit order."""
+        stmt = select(OutboxEvent).order_by(OutboxEvent.created_at, OutboxEvent.id).limit(limit)
+        return (await self.session.execute(stmt)).scalars().all()
+
+    async def delete_published(self, event_ids: List[UUID]):
+        """Does not commit."""
+        await self.session.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(event_ids)))
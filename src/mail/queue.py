@@ -0,0 +1,306 @@
+import asyncio
+import json
+import os
+import socket
+import time
+from typing import Optional
+from uuid import uuid4
+
+import aiosmtplib
+from loguru import logger
+
+from src.core.redis_manager import get_redis
+from src.core.settings import settings
+from src.mail.mail import EmailSchema, build_message
+
+# Sunucu bu mesajı reddetti ama bağlantı sağlam; kalan mesajlar aynı bağlantıyla gider
+MESSAGE_ERRORS = (aiosmtplib.SMTPRecipientsRefused, aiosmtplib.SMTPSenderRefused, aiosmtplib.SMTPDataError)
+
+# Vadesi gelen yeniden denemeleri kuyruğa tek adımda taşır; iki worker aynı mesajı almaz
+PROMOTE_DUE = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #due > 0 then
+    redis.call('ZREM', KEYS[1], unpack(due))
+    redis.call('RPUSH', KEYS[2], unpack(due))
+end
+return #due
+"""
+
+# ARGV[1] mesajı kuyruktan worker'ın işlem listesine taşır (toplu LMOVE); gönderilene kadar orada kalır
+CLAIM_BATCH = """
+local batch = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #batch > 0 then
+    redis.call('LTRIM', KEYS[1], #batch, -1)
+    redis.call('RPUSH', KEYS[2], unpack(batch))
+end
+return batch
+"""
+
+# İşlem listesinde kalan (gönderilmemiş) mesajları sırasıyla kuyruğun başına geri koyar
+REQUEUE = """
+local pending = redis.call('LRANGE', KEYS[1], 0, -1)
+for i = #pending, 1, -1 do
+    redis.call('LPUSH', KEYS[2], pending[i])
+end
+redis.call('DEL', KEYS[1])
+return #pending
+"""
+
+# Bu süre boyunca nabız atmayan worker'ın işlem listesi sahipsiz sayılır. Nabız gönderimden
+# bağımsız bir görevde atar: 50 mesajlık parti 30 sn'lik SMTP zaman aşımlarıyla bundan uzun sürebilir
+HEARTBEAT_SECONDS = 60
+HEARTBEAT_INTERVAL = HEARTBEAT_SECONDS / 3
+
+
+class MailQueue:
+    """
+    Outgoing mail, queued in Redis and sent over one long-lived SMTP connection.
+
+    Requests only RPUSH the message (`enqueue`) and wake the local dispatcher; every
+    `poll_interval` it also drains mail queued by other workers. A round pops up to
+    `batch_size` messages and sends them back to back on the open connection, which is
+    reopened on demand (connect, STARTTLS and login once, not per message) and closed
+    after `idle_timeout` seconds without mail.
+
+    A round moves its batch to this worker's processing list in one script (a batched
+    LMOVE) and removes each message from there once it is sent, rescheduled or
+    dropped. `stop` and a connection error put whatever is left back at the head of
+    the queue; the processing list of a worker that died without stopping is requeued
+    by the others once its heartbeat key expires. The heartbeat is refreshed by its own
+    task every HEARTBEAT_INTERVAL, so a slow batch does not let it expire. Delivery is
+    therefore at least once: a message cut off mid-send can go out twice, but none is lost.
+
+    A temporary failure (4xx, connection error) puts the message on the retry ZSET,
+    due after retry_base * 2^(attempt - 1) seconds; a connection error also pauses the
+    dispatcher for `retry_base` seconds. After `max_attempts`, or when the server
+    refuses the message with a 5xx, it is logged and dropped.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        start_tls: bool = True,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        batch_size: int = 50,
+        max_attempts: int = 5,
+        retry_base: float = 5.0,
+        poll_interval: float = 1.0,
+        idle_timeout: float = 30.0,
+        prefix: str = "mail",
+        redis=None,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.start_tls = start_tls
+        self.username = username
+        self.password = password
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.prefix = prefix
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self.queue_key = f"{prefix}:queue"    # LIST, en eski mesaj başta
+        self.retry_key = f"{prefix}:retry"    # ZSET, score = sonraki denemenin zamanı
+        self.processing_key = f"{prefix}:processing:{self.consumer}"  # LIST, bu worker'ın gönderdiği parti
+        self.heartbeat_key = f"{prefix}:alive:{self.consumer}"
+        self._redis = redis
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._last_used = 0.0
+        self._resume_at = 0.0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+
+        self.sent = 0
+        self.retried = 0
+        self.dropped = 0
+        self.connections = 0
+        self.recovered = 0
+
+    async def _client(self):
+        return self._redis or await get_redis()
+
+    async def enqueue(self, email: EmailSchema):
+        """Queues the message for the dispatcher; a Redis failure is logged and never fails the request."""
+        message = {"id": uuid4().hex, "attempt": 0, **email.model_dump()}
+        try:
+            redis = await self._client()
+            await redis.rpush(self.queue_key, json.dumps(message))
+        except Exception as e:
+            logger.error(f"❌ Failed to queue email to {email.email}: {e}")
+            return
+        self._wakeup.set()
+
+    async def _connection(self) -> aiosmtplib.SMTP:
+        if self._smtp is not None and self._smtp.is_connected:
+            return self._smtp
+        smtp = aiosmtplib.SMTP(hostname=self.hostname, port=self.port, start_tls=self.start_tls, timeout=30)
+        await smtp.connect()
+        if self.username:
+            await smtp.login(self.username, self.password)
+        self._smtp = smtp
+        self.connections += 1
+        return smtp
+
+    async def _disconnect(self):
+        smtp, self._smtp = self._smtp, None
+        if smtp is None:
+            return
+        try:
+            await smtp.quit()
+        except Exception:
+            smtp.close()
+
+    async def _send(self, message: dict):
+        smtp = await self._connection()
+        try:
+            await smtp.send_message(build_message(EmailSchema(**message)))
+        except aiosmtplib.SMTPServerDisconnected:
+            # Sunucu boşta kalan bağlantıyı kapatmış olabilir: bir kez yeniden bağlan
+            self._smtp = None
+            smtp = await self._connection()
+            await smtp.send_message(build_message(EmailSchema(**message)))
+        self._last_used = time.monotonic()
+
+    async def _retry_later(self, redis, message: dict, error: Exception):
+        message["attempt"] += 1
+        if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+            permanent = all(refused.code >= 500 for refused in error.recipients)
+        else:
+            permanent = isinstance(error, MESSAGE_ERRORS) and error.code >= 500
+        if permanent or message["attempt"] >= self.max_attempts:
+            logger.error(f"❌ Dropping email to {message['email']} after {message['attempt']} attempts: {error}")
+            self.dropped += 1
+            return
+        delay = self.retry_base * 2 ** (message["attempt"] - 1)
+        logger.warning(f"Email to {message['email']} failed, retrying in {delay:.0f}s: {error}")
+        await redis.zadd(self.retry_key, {json.dumps(message): time.time() + delay})
+        self.retried += 1
+
+    async def requeue_pending(self, processing_key: Optional[str] = None) -> int:
+        """Puts unsent messages of a processing list (this worker's by default) back at the head of the queue."""
+        redis = await self._client()
+        return await redis.eval(REQUEUE, 2, processing_key or self.processing_key, self.queue_key)
+
+    async def recover_orphans(self) -> int:
+        """Requeues the processing lists of workers whose heartbeat expired; returns how many messages."""
+        redis = await self._client()
+        recovered = 0
+        async for key in redis.scan_iter(match=f"{self.prefix}:processing:*"):
+            consumer = (key.decode() if isinstance(key, bytes) else key).rsplit(":", 1)[-1]
+            if consumer != self.consumer and not await redis.exists(f"{self.prefix}:alive:{consumer}"):
+                recovered += await self.requeue_pending(key)
+        if recovered:
+            logger.warning(f"Requeued {recovered} emails left behind by stopped workers")
+            self.recovered += recovered
+        return recovered
+
+    async def dispatch_once(self) -> int:
+        """Sends one batch; returns how many messages were delivered."""
+        if time.monotonic() < self._resume_at:
+            return 0
+        redis = await self._client()
+        await redis.set(self.heartbeat_key, "1", ex=HEARTBEAT_SECONDS)
+        await redis.eval(PROMOTE_DUE, 2, self.retry_key, self.queue_key, time.time(), self.batch_size)
+        batch = await redis.eval(CLAIM_BATCH, 2, self.queue_key, self.processing_key, self.batch_size)
+        sent = 0
+        for raw in batch:
+            message = json.loads(raw)
+            try:
+                await self._send(message)
+                sent += 1
+            except MESSAGE_ERRORS as e:
+                await self._retry_later(redis, message, e)
+            except Exception as e:
+                # Sunucuya ulaşılamıyor: bu mesaj yeniden denenir, kalanlar sırasıyla kuyruğun başına döner
+                await self._disconnect()
+                self._resume_at = time.monotonic() + self.retry_base
+                await self._retry_later(redis, message, e)
+                await redis.lrem(self.processing_key, 1, raw)
+                await self.requeue_pending()
+                break
+            await redis.lrem(self.processing_key, 1, raw)
+        self.sent += sent
+        if sent:
+            logger.info(f"✅ Sent {sent} emails")
+        return sent
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_recovery = 0.0
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                if loop.time() >= next_recovery:
+                    await self.recover_orphans()
+                    next_recovery = loop.time() + HEARTBEAT_SECONDS
+                while await self.dispatch_once() == self.batch_size:
+                    pass
+                if self._smtp is not None and time.monotonic() - self._last_used > self.idle_timeout:
+                    await self._disconnect()
+            except Exception as e:
+                logger.error(f"Mail dispatch round failed: {e}")
+
+    async def _beat(self):
+        while True:
+            try:
+                redis = await self._client()
+                await redis.set(self.heartbeat_key, "1", ex=HEARTBEAT_SECONDS)
+            except Exception as e:
+                logger.error(f"Mail dispatcher heartbeat failed: {e}")
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    def start(self):
+        if self._task is None:
+            self._heartbeat = asyncio.create_task(self._beat())
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops the dispatcher; mail it had taken but not sent goes back to the queue for the next worker."""
+        for task in (self._task, self._heartbeat):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._heartbeat = None
+        try:
+            requeued = await self.requeue_pending()
+            if requeued:
+                logger.info(f"Requeued {requeued} unsent emails on shutdown")
+            redis = await self._client()
+            await redis.delete(self.heartbeat_key)
+        except Exception as e:
+            logger.error(f"Could not requeue unsent emails, they are recovered after {HEARTBEAT_SECONDS}s: {e}")
+        await self._disconnect()
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "recovered": self.recovered,
+            "connections_opened": self.connections,
+            "connected": self._smtp is not None and self._smtp.is_connected,
+        }
+
+
+mail_queue = MailQueue(
+    hostname=settings.MAIL_SERVER,
+    port=settings.MAIL_PORT,
+    start_tls=settings.MAIL_STARTTLS,
+    username=settings.MAIL_FROM if settings.MAIL_USE_CREDENTIALS else None,
+    password=settings.MAIL_PASSWORD if settings.MAIL_USE_CREDENTIALS else None,
+    batch_size=settings.MAIL_BATCH_SIZE,
+    max_attempts=settings.MAIL_MAX_ATTEMPTS,
+    retry_base=settings.MAIL_RETRY_BASE_SECONDS,
+)
@@ -1,16 +1,27 @@
-from fastapi import FastAPI, Response, status, HTTPException, Depends, APIRouter
+import asyncio
+from fastapi import FastAPI, Request, Response, status, HTTPException, Depends, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
 from src.errors import register_all_errors
 from src.auth.routers import router as auth_router
 from order.routers import router as order_process_router
-from src.db.database import AsyncSession
-from src.table.seed import seed_tables
+from src.db.query_count import SQL_COUNT_HEADER, capture_statements
+from src.db.seeding import run_startup_seeds
 from src.table.routers import router as table_router
 from src.menu.routers import router as menu_router 
 from src.payment.routers import router as payment_router
-from src.menu.seed import seed_menus
+from src.analytics.routers import router as analytics_router
+from src.core.routers import router as metrics_router
+from src.core.settings import settings
 from fastapi.staticfiles import StaticFiles
-from src.user.seeds import seed as user_seed
+from src.core.redis_manager import RedisManager
+from order.events import kitchen_channel
+from src.table.floor import floor_channel
+from src.auth.utils import password_executor
+from src.auth.token_cache import start_revocation_listener, stop_revocation_listener
+from src.auth.principal_cache import start_principal_listener, stop_principal_listener
+from src.core.counters import counter_buffer
+from src.events.handlers import start_event_pipeline, stop_event_pipeline
+from src.mail.queue import mail_queue
 
 version = "v1"
 version_prefix = f"/api/{version}"
@@ -34,7 +45,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", SQL_COUNT_HEADER],
 )
+
+if settings.DB_SQL_COUNT_HEADER:
+    @app.middleware("http")
+    async def sql_count_header(request: Request, call_next):
+        # Geliştirme/test için: yanıt başlığında isteğin gönderdiği SQL sayısı
+        with capture_statements() as statements:
+            response = await call_next(request)
+        response.headers[SQL_COUNT_HEADER] = str(len(statements))
+        return response
+
 api_router = APIRouter(prefix=version_prefix)
 
 api_router.include_router(auth_router)
@@ -43,25 +65,44 @@ app.include_router(api_router)
 app.include_router(table_router)
 app.include_router(menu_router)
 app.include_router(payment_router)
+app.include_router(metrics_router)
+app.include_router(analytics_router)
 
 @app.get("/")
 def read_root():
     return {"api": "welcome to app "}
 
 @app.on_event("startup")
-async def seed_initial_tables():
-    async with AsyncSession() as db:
-        await seed_tables(db)
+async def seed_reference_data():
+    # Seed arka planda çalışır; worker istek kabul etmeye hemen başlar
+    if settings.SEED_ON_STARTUP:
+        app.state.seed_task = asyncio.create_task(run_startup_seeds())
 
 @app.on_event("startup")
-async def startup():
-    async with AsyncSession() as db:
-        await seed_menus(db) 
-
+async def start_listeners():
+    await start_revocation_listener()
+    await start_principal_listener()
+    counter_buffer.start()
+    mail_queue.start()
+    await start_event_pipeline()
 
-""" @app.on_event("startup")
-async def seed_user():
-    async with AsyncSession() as db:
-        await user_seed()
- 
- """
+@app.on_event("shutdown")
+async def shutdown():
+    await stop_revocation_listener()
+    await stop_principal_listener()
+    # Analytics tüketicisi sayaç tamponuna yazar; tampon en son boşaltılır
+    await stop_event_pipeline()
+    await counter_buffer.stop()
+    await mail_queue.stop()
+    await kitchen_channel.close()
+    await floor_channel.close()
+    password_executor.shutdown()
+    seed_task = getattr(app.state, "seed_task", None)
+    if seed_task is not None:
+        # Yarım kalan seed transaction'ı geri alınır; seed idempotent, bir sonraki açılışta yeniden çalışır
+        seed_task.cancel()
+        try:
+            await seed_task
+        except asyncio.CancelledError:
+            pass
+    await RedisManager.close_client()
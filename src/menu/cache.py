@@ -0,0 +1,66 @@
+import hashlib
+from typing import Awaitable, Callable, Dict, Tuple
+
+from loguru import logger
+from redis.exceptions import RedisError
+from src.core.redis_manager import get_redis
+
+
+class MenuSnapshotCache:
+    """
+    Pre-serialized menu snapshots cached per process and in Redis.
+
+    A shared version counter is bumped on every menu write; each snapshot is
+    stored under its version, so a stale one is simply never looked up again.
+    """
+
+    VERSION_KEY = "menu:version"
+    SNAPSHOT_TTL = 24 * 3600
+
+    def __init__(self):
+        self._local: Dict[str, Tuple[int, bytes, str]] = {}
+
+    @staticmethod
+    def make_etag(body: bytes) -> str:
+        return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+    async def get(self, kind: str, loader: Callable[[], Awaitable[bytes]]) -> Tuple[bytes, str]:
+        """Returns (json bytes, strong etag) of the `kind` snapshot, building it with `loader` on a miss."""
+        try:
+            redis = await get_redis()
+            version = int(await redis.get(self.VERSION_KEY) or 0)
+            local = self._local.get(kind)
+            if local is not None and local[0] == version:
+                return local[1], local[2]
+            snapshot_key = f"menu:{kind}:{version}"
+            cached = await redis.get(snapshot_key)
+        except (RedisError, RuntimeError) as e:
+            # get_redis bağlanamayınca RuntimeError fırlatır
+            logger.error(f"Menu cache unavailable, reading from the database: {e}")
+            body = await loader()
+            return body, self.make_etag(body)
+
+        if cached is not None:
+            body = cached.encode()
+        else:
+            body = await loader()
+            try:
+                await redis.set(snapshot_key, body, ex=self.SNAPSHOT_TTL)
+            except RedisError as e:
+                logger.error(f"Failed to store the menu snapshot, serving it uncached: {e}")
+
+        etag = self.make_etag(body)
+        self._local[kind] = (version, body, etag)
+        return body, etag
+
+    async def bump_version(self):
+        """Invalidates every menu snapshot in every worker."""
+        try:
+            redis = await get_redis()
+            await redis.incr(self.VERSION_KEY)
+        except Exception as e:
+            logger.error(f"Failed to bump menu cache version: {e}")
+        self._local.clear()
+
+
+menu_cache = MenuSnapshotCache()
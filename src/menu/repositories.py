@@ -1,5 +1,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from typing import List, Optional, Tuple
+from uuid import UUID
 from src.db.models import MenuItem, MenuCategory
 from src.utils.base_repository import BaseRepository
 
@@ -7,6 +9,22 @@ class MenuCategoryRepository(BaseRepository[MenuCategory]):
     def __init__(self, session: AsyncSession):
         super().__init__(MenuCategory, session)
 
+    async def get_all_for_listing(self) -> List[MenuCategory]:
+        stmt = select(MenuCategory)
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
 class MenuItemRepository(BaseRepository[MenuItem]):
     def __init__(self, session: AsyncSession):
-        super().__init__(MenuItem, session)
\ No newline at end of file
+        super().__init__(MenuItem, session)
+
+    async def get_all_for_listing(self) -> List[MenuItem]:
+        stmt = select(MenuItem)
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
+    async def get_listing_page(
+        self, limit: int, cursor: Optional[str] = None, category_id: Optional[UUID] = None
+    ) -> Tuple[List[MenuItem], Optional[str]]:
+        filters = [MenuItem.category_id == category_id] if category_id else []
+        return await self.get_page(limit, cursor, filters=filters)
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from uuid import UUID
 from src.db.dependencies import get_db
 from src.menu.schemas import (
 MenuItemCreate,
@@ -9,9 +11,17 @@ MenuCategoryResponse
 )
 from src.menu.repositories import MenuItemRepository, MenuCategoryRepository
 from src.menu.services import MenuService
+from src.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, set_next_cursor
 
 router = APIRouter(prefix="/menu", tags=["Menu"])
 
+def cached_json_response(request: Request, body: bytes, etag: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 def get_service(db: AsyncSession = Depends(get_db)):
     item_repo = MenuItemRepository(db)
     category_repo = MenuCategoryRepository(db)
@@ -22,13 +32,27 @@ async def create_category(request: MenuCategoryCreate, service: MenuService = De
     return await service.create_category(request)
 
 @router.get("/categories", response_model=list[MenuCategoryResponse])
-async def list_categories(service: MenuService = Depends(get_service)):
-    return await service.get_all_categories()
+async def list_categories(request: Request, service: MenuService = Depends(get_service)):
+    body, etag = await service.get_categories_snapshot()
+    return cached_json_response(request, body, etag)
 
 @router.post("/items", response_model=MenuItemResponse)
 async def create_item(request: MenuItemCreate, service: MenuService = Depends(get_service)):
     return await service.create_menu_item(request)
 
 @router.get("/items", response_model=list[MenuItemResponse])
-async def list_items(service: MenuService = Depends(get_service)):
-    return await service.get_all_menu_items()
\ No newline at end of file
+async def list_items(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+    category_id: Optional[UUID] = Query(None, description="Filter by category"),
+    service: MenuService = Depends(get_service),
+):
+    # Parametresiz istek tüm menüyü ister; önbellekteki snapshot ile cevaplanır
+    if limit is None and cursor is None and category_id is None:
+        body, etag = await service.get_menu_items_snapshot()
+        return cached_json_response(request, body, etag)
+    items, next_cursor = await service.get_menu_items_page(limit or DEFAULT_PAGE_SIZE, cursor, category_id)
+    set_next_cursor(response, next_cursor)
+    return items
\ No newline at end of file
@@ -1,4 +1,6 @@
 from src.db.models import MenuCategory, MenuItem
+from sqlalchemy import Numeric, String, column, literal, update, values
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from decimal import Decimal
@@ -183,39 +185,50 @@ items_data = [
 }
 ]
 
-async def seed_menus(db: AsyncSession):
-    # Kategorileri oluştur
-    existing_categories = await db.execute(select(MenuCategory))
-    existing_names = {c.name for c in existing_categories.scalars().all()}
-    for cat in categories_data:
-        if cat["name"] not in existing_names:
-            db.add(MenuCategory(**cat))
+async def seed_menus(db: AsyncSession) -> int:
+    """
+    Inserts the missing categories and items; returns how many rows changed. Does not commit.
 
-    await db.commit()
+    menu_item.name has no unique constraint, so items are matched by name with NOT EXISTS
+    instead of ON CONFLICT; the caller holds the seed advisory lock, so nothing races it.
+    """
+    categories = (
+        insert(MenuCategory)
+        .values([{**cat, "is_active": True} for cat in categories_data])
+        .on_conflict_do_nothing(index_elements=[MenuCategory.name])
+    )
+    changed = (await db.execute(categories)).rowcount
 
-    # Kategorilerle ilişkilendirerek ürünleri ekle
-    for item in items_data:
-        category_stmt = select(MenuCategory).where(MenuCategory.name == item["category_name"])
-        result = await db.execute(category_stmt)
-        category = result.scalars().first()
+    seed = values(
+        column("name", String),
+        column("description", String),
+        column("price", Numeric(10, 2)),
+        column("category_name", String),
+        column("image_url", String),
+        name="seed",
+    ).data([
+        (item["name"], item["description"], item["price"], item["category_name"], item["image_url"])
+        for item in items_data
+    ])
 
-        if category:  
-            item_stmt = select(MenuItem).where(MenuItem.name == item["name"])  
-            result = await db.execute(item_stmt)  
-            existing_item = result.scalars().first()  
+    # Kategorilerle ilişkilendirerek eksik ürünleri ekle
+    missing_items = (
+        select(seed.c.name, seed.c.description, seed.c.price, MenuCategory.id, seed.c.image_url, literal(True))
+        .select_from(seed)
+        .join(MenuCategory, MenuCategory.name == seed.c.category_name)
+        .where(~select(MenuItem.id).where(MenuItem.name == seed.c.name).exists())
+    )
+    items = insert(MenuItem).from_select(
+        ["name", "description", "price", "category_id", "image_url", "is_active"], missing_items
+    )
+    changed += (await db.execute(items)).rowcount
 
-            if not existing_item:  
-                db.add(MenuItem(  
-                    name=item["name"],  
-                    description=item["description"],  
-                    price=item["price"],  
-                    category_id=category.id,  
-                    image_url=item["image_url"]  
-                ))  
-            else:  
-                # Güncelleme yapılacaksa  
-                if not existing_item.image_url and item.get("image_url"):  
-                    existing_item.image_url = item["image_url"]  
-                    db.add(existing_item)  
-
-    await db.commit()
\ No newline at end of file
+    # Görseli eksik olan mevcut ürünleri tamamla
+    images = (
+        update(MenuItem)
+        .where(MenuItem.name == seed.c.name, MenuItem.image_url.is_(None))
+        .values(image_url=seed.c.image_url)
+        .execution_options(synchronize_session=False)
+    )
+    changed += (await db.execute(images)).rowcount
+    return changed
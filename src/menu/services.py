@@ -1,6 +1,12 @@
+from typing import List, Optional, Tuple
 from uuid import UUID
+from pydantic import TypeAdapter
 from src.menu.repositories import MenuItemRepository, MenuCategoryRepository
-from src.menu.schemas import MenuItemCreate, MenuCategoryCreate
+from src.menu.schemas import MenuItemCreate, MenuCategoryCreate, MenuItemResponse, MenuCategoryResponse
+from src.menu.cache import menu_cache
+
+menu_items_adapter = TypeAdapter(List[MenuItemResponse])
+menu_categories_adapter = TypeAdapter(List[MenuCategoryResponse])
 
 class MenuService:
     def __init__(self, item_repo: MenuItemRepository, category_repo: MenuCategoryRepository):
@@ -8,16 +14,41 @@ class MenuService:
         self.category_repo = category_repo
     
     async def create_category(self, data: MenuCategoryCreate):
-        return await self.category_repo.create(data)
+        category = await self.category_repo.create(data)
+        await menu_cache.bump_version()
+        return category
 
     async def get_all_categories(self):
-        return await self.category_repo.get_all()
+        return await self.category_repo.get_all_for_listing()
 
     async def create_menu_item(self, data: MenuItemCreate):
-        return await self.item_repo.create(data)
+        item = await self.item_repo.create(data)
+        await menu_cache.bump_version()
+        return item
 
     async def get_all_menu_items(self):
-        return await self.item_repo.get_all()
+        return await self.item_repo.get_all_for_listing()
+
+    async def get_menu_items_page(self, limit: int, cursor: Optional[str] = None, category_id: Optional[UUID] = None):
+        return await self.item_repo.get_listing_page(limit, cursor, category_id=category_id)
 
     async def get_menu_item_by_id(self, item_id: UUID):
         return await self.item_repo.get_by_id(item_id)
+
+    async def get_categories_snapshot(self) -> Tuple[bytes, str]:
+        """Serialized category list and its ETag."""
+        async def load() -> bytes:
+            categories = await self.get_all_categories()
+            return menu_categories_adapter.dump_json(
+                menu_categories_adapter.validate_python(categories, from_attributes=True)
+            )
+        return await menu_cache.get("categories", load)
+
+    async def get_menu_items_snapshot(self) -> Tuple[bytes, str]:
+        """Serialized menu item list and its ETag."""
+        async def load() -> bytes:
+            items = await self.get_all_menu_items()
+            return menu_items_adapter.dump_json(
+                menu_items_adapter.validate_python(items, from_attributes=True)
+            )
+        return await menu_cache.get("items", load)
@@ -0,0 +1,217 @@
+import asyncio
+from typing import Optional
+from uuid import UUID, uuid4
+
+from loguru import logger
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.redis_manager import CONSUME_IF_EQUAL, get_redis
+from src.core.settings import settings
+from src.db.models import Order, Waiter, waiter_table_link
+from src.order.enums import OrderStatus
+
+# Garson bu durumlardaki siparişlerle meşgul sayılır
+OPEN_STATUSES = (OrderStatus.NEW, OrderStatus.IN_PROGRESS, OrderStatus.READY)
+
+# Anahtarlar "<prefix>:..." biçiminde, varsayılan prefix "waiters"
+ROSTER_KEY = "{}:roster"        # ZSET, all scores 0 -> stable order for round-robin
+LOAD_KEY = "{}:load"            # ZSET, score = open orders
+CURSOR_KEY = "{}:rr"            # round-robin counter
+READY_KEY = "{}:ready"          # set while the roster is fresh
+REBUILD_LOCK_KEY = "{}:rebuild" # SET NX to the rebuilding worker's token
+SECTION_KEY = "{}:section:{}"   # SET of waiters serving a table
+
+# Yeniden kurulum birkaç sorgu sürer; kilit çöken bir worker'da bundan sonra kendiliğinden düşer
+REBUILD_LOCK_SECONDS = 10
+# Kadro boşken kilidi kaçıran istek bu kadar bekler, sonra garsonu veritabanından seçer
+REBUILD_WAIT_SECONDS = 2
+
+# Each script picks and books a waiter atomically, so two workers never read the same load
+ROUND_ROBIN = """
+local n = redis.call('ZCARD', KEYS[1])
+if n == 0 then return false end
+local i = redis.call('INCR', KEYS[3]) % n
+local waiter = redis.call('ZRANGE', KEYS[1], i, i)[1]
+redis.call('ZINCRBY', KEYS[2], 1, waiter)
+return waiter
+"""
+
+LEAST_LOADED = """
+local waiter = redis.call('ZRANGE', KEYS[1], 0, 0)[1]
+if not waiter then return false end
+redis.call('ZINCRBY', KEYS[1], 1, waiter)
+return waiter
+"""
+
+SECTION = """
+local best, best_load
+for _, waiter in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+    local load = tonumber(redis.call('ZSCORE', KEYS[2], waiter))
+    if load and (best == nil or load < best_load) then
+        best, best_load = waiter, load
+    end
+end
+if not best then
+    best = redis.call('ZRANGE', KEYS[2], 0, 0)[1]
+    if not best then return false end
+end
+redis.call('ZINCRBY', KEYS[2], 1, best)
+return best
+"""
+
+# Yalnızca kadrodaki garson; kadroda olmayan bir sonraki yeniden kurulumda sayılır
+BOOK = """
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) then redis.call('ZINCRBY', KEYS[1], 1, ARGV[1]) end
+return 1
+"""
+
+RELEASE = """
+local load = tonumber(redis.call('ZSCORE', KEYS[1], ARGV[1]))
+if load and load > 0 then redis.call('ZINCRBY', KEYS[1], -1, ARGV[1]) end
+return 1
+"""
+
+
+class WaiterAssigner:
+    """
+    Assigns orders to waiters from a live roster kept in Redis.
+
+    Strategies (settings.WAITER_ASSIGNMENT_STRATEGY):
+      - round_robin:  next waiter in a stable ring, O(log n)
+      - least_loaded: waiter with the fewest open orders, O(log n)
+      - section:      least loaded among the waiters linked to the table via
+                      waiter_table_link, falling back to least_loaded
+
+    The scripts run with EVALSHA; only the first call per script sends its source.
+    The roster is rebuilt from the database when READY_KEY expires
+    (WAITER_ROSTER_TTL); that also corrects any drift in the load counters. One
+    worker rebuilds at a time under REBUILD_LOCK_KEY, the others keep assigning
+    from the previous roster meanwhile. On a cold roster there is nothing to assign
+    from: they wait up to REBUILD_WAIT_SECONDS for the rebuild, then pick a waiter
+    from the database.
+    """
+
+    def __init__(self, strategy: str, prefix: str = "waiters", redis=None):
+        if strategy not in ("round_robin", "least_loaded", "section"):
+            raise ValueError(f"Unknown waiter assignment strategy: {strategy}")
+        self.strategy = strategy
+        self.prefix = prefix
+        self.roster_key = ROSTER_KEY.format(prefix)
+        self.load_key = LOAD_KEY.format(prefix)
+        self.cursor_key = CURSOR_KEY.format(prefix)
+        self.ready_key = READY_KEY.format(prefix)
+        self.lock_key = REBUILD_LOCK_KEY.format(prefix)
+        self._redis = redis
+        self._scripts = {}
+
+    def section_key(self, table_id) -> str:
+        return SECTION_KEY.format(self.prefix, table_id)
+
+    async def _client(self):
+        return self._redis or await get_redis()
+
+    async def _run(self, redis, source: str, keys: list, args: tuple = ()):
+        # register_script SHA'yı bir kez hesaplar; NOSCRIPT gelirse kaynağı yükleyip tekrar dener
+        script = self._scripts.get(source)
+        if script is None:
+            script = self._scripts[source] = redis.register_script(source)
+        return await script(keys=keys, args=args, client=redis)
+
+    async def rebuild(self, session: AsyncSession) -> bool:
+        """
+        Loads waiters, their open order counts and their sections with three column-only
+        queries; returns False when another worker holds the rebuild lock or just finished.
+        """
+        redis = await self._client()
+        token = uuid4().hex
+        if not await redis.set(self.lock_key, token, nx=True, ex=REBUILD_LOCK_SECONDS):
+            return False
+        try:
+            # Kilidi beklerken başka bir worker kurmuş olabilir; yeniden kurmak onun rezervasyonlarını siler
+            if await redis.exists(self.ready_key):
+                return False
+            waiters = Waiter.__table__
+            waiter_ids = [str(row.id) for row in await session.execute(select(waiters.c.id))]
+            loads = dict(
+                (str(row.waiter_id), row.open_orders)
+                for row in await session.execute(
+                    select(Order.waiter_id, func.count().label("open_orders"))
+                    .where(Order.waiter_id.is_not(None), Order.status.in_(OPEN_STATUSES))
+                    .group_by(Order.waiter_id)
+                )
+            )
+            links = (await session.execute(select(waiter_table_link))).all()
+
+            old_sections = [key async for key in redis.scan_iter(match=self.section_key("*"))]
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.delete(self.roster_key, self.load_key, *old_sections)
+                if waiter_ids:
+                    pipe.zadd(self.roster_key, {waiter_id: 0 for waiter_id in waiter_ids})
+                    pipe.zadd(self.load_key, {waiter_id: loads.get(waiter_id, 0) for waiter_id in waiter_ids})
+                for link in links:
+                    pipe.sadd(self.section_key(link.table_id), str(link.waiter_id))
+                pipe.set(self.ready_key, "1", ex=settings.WAITER_ROSTER_TTL)
+                await pipe.execute()
+        finally:
+            # Kilit süresi dolduysa artık başka bir worker'ındır; yalnızca kendi token'ımızı sil
+            await self._run(redis, CONSUME_IF_EQUAL, [self.lock_key], (token,))
+        logger.info(f"Waiter roster rebuilt | waiters={len(waiter_ids)} | links={len(links)}")
+        return True
+
+    async def _wait_for_rebuild(self, redis) -> bool:
+        deadline = asyncio.get_running_loop().time() + REBUILD_WAIT_SECONDS
+        while not await redis.exists(self.ready_key):
+            if asyncio.get_running_loop().time() >= deadline:
+                return False
+            await asyncio.sleep(0.05)
+        return True
+
+    async def _pick_from_database(self, session: AsyncSession) -> Optional[UUID]:
+        waiters = Waiter.__table__
+        return await session.scalar(select(waiters.c.id).order_by(func.random()).limit(1))
+
+    async def assign(self, session: AsyncSession, table_id: UUID) -> Optional[UUID]:
+        """Picks and books a waiter for an order at `table_id`; None if there are no waiters."""
+        try:
+            redis = await self._client()
+            if not await redis.exists(self.ready_key) and not await self.rebuild(session):
+                # Başka bir worker kuruyor: eski kadro varsa ondan ata, yoksa kurulumu bekle
+                if not await redis.exists(self.roster_key) and not await self._wait_for_rebuild(redis):
+                    logger.warning("Waiter roster is still being rebuilt, picking a random waiter from the database")
+                    return await self._pick_from_database(session)
+
+            if self.strategy == "round_robin":
+                waiter_id = await self._run(redis, ROUND_ROBIN, [self.roster_key, self.load_key, self.cursor_key])
+            elif self.strategy == "least_loaded":
+                waiter_id = await self._run(redis, LEAST_LOADED, [self.load_key])
+            else:
+                waiter_id = await self._run(redis, SECTION, [self.section_key(table_id), self.load_key])
+        except Exception as e:
+            logger.error(f"Waiter roster unavailable, picking a random waiter from the database: {e}")
+            return await self._pick_from_database(session)
+
+        return UUID(waiter_id) if waiter_id else None
+
+    async def book(self, waiter_id: Optional[UUID]):
+        """Takes one open-order slot for a waiter chosen outside `assign` (e.g. the approving waiter)."""
+        if waiter_id is None:
+            return
+        try:
+            redis = await self._client()
+            await self._run(redis, BOOK, [self.load_key], (str(waiter_id),))
+        except Exception as e:
+            logger.error(f"Failed to book waiter {waiter_id}: {e}")
+
+    async def release(self, waiter_id: Optional[UUID]):
+        """Frees one open-order slot of the waiter (order served, paid or canceled)."""
+        if waiter_id is None:
+            return
+        try:
+            redis = await self._client()
+            await self._run(redis, RELEASE, [self.load_key], (str(waiter_id),))
+        except Exception as e:
+            logger.error(f"Failed to release waiter {waiter_id}: {e}")
+
+
+waiter_assigner = WaiterAssigner(settings.WAITER_ASSIGNMENT_STRATEGY)
@@ -0,0 +1,23 @@
+from src.core.redis_manager import PubSubChannel
+from order.schemas import OrderItemCreate, OrderStatus
+from order.utils import format_item_summary
+
+# Mutfak ekranında gösterilen durumlar
+KITCHEN_STATUSES = (OrderStatus.IN_PROGRESS, OrderStatus.READY)
+
+kitchen_channel = PubSubChannel("kitchen:orders")
+
+
+async def notify_kitchen(session, event) -> None:
+    """
+    Publishes an order event from the outbox to every kitchen screen.
+
+    Screens show an order while its status is in KITCHEN_STATUSES and drop it
+    otherwise; new orders also carry a one-line item summary. A Redis failure
+    raises, so the event stays pending and is retried.
+    """
+    order = event.payload["order"]
+    message = {"type": event.type, "order": order}
+    if event.type == "order.created":
+        message["summary"] = format_item_summary([OrderItemCreate(**item) for item in order["items"]])
+    await kitchen_channel.publish(message)
@@ -1,13 +1,40 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.utils.base_repository import BaseRepository
 from sqlalchemy.future import select
+from sqlalchemy import func, insert, update, values, column, literal, true, Integer, String, Numeric, Uuid
 from uuid import UUID
 from loguru import logger
 
-from src.db.models import Order, OrderItem, OrderStatus
+from src.db.models import Order, OrderItem, OrderStatus, Payment
+from src.analytics.repositories import SalesRollupRepository
 from decimal import Decimal
-from typing import List, Optional
-from order.schemas import OrderItemCreate
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+from src.utils.pagination import apply_keyset, split_page
+from src.utils.streaming import EXPORT_BATCH_SIZE
+from order.schemas import OrderItemCreate, OrderItemResponse, OrderResponse
+
+
+# OrderResponse'un ihtiyaç duyduğu kolonlar — ilişkiler yüklenmez
+ORDER_RESPONSE_COLUMNS = (
+    Order.id,
+    Order.table_id,
+    Order.waiter_id,
+    Order.status,
+    Order.special_request,
+    Order.total_amount,
+    Order.is_paid,
+)
+
+ORDER_ITEM_RESPONSE_COLUMNS = (
+    OrderItem.order_id,
+    OrderItem.menu_item_id,
+    OrderItem.item_name,
+    OrderItem.unit_price,
+    OrderItem.quantity,
+)
+
+ORDER_EXPORT_COLUMNS = ORDER_RESPONSE_COLUMNS + (Order.created_at,)
 
 
 class OrderRepository(BaseRepository[Order]):
@@ -21,41 +48,240 @@ class OrderRepository(BaseRepository[Order]):
         await self.session.refresh(order)
         return order
 
-    async def get_by_id(self, order_id: UUID) -> Order:
-        stmt = select(Order).where(Order.id == order_id)
-        result = await self.session.execute(stmt)
-        return result.unique().scalar_one_or_none()
+    async def insert_with_items(self, order_values: dict, items: List[OrderItemCreate]) -> None:
+        """
+        Writes the order and all of its line items in a single statement:
+
+            WITH new_order AS (INSERT INTO "order" ... RETURNING id)
+            INSERT INTO order_item (...) SELECT new_order.id, lines.* FROM new_order, (VALUES ...) lines
+        """
+        logger.info(f"[Repo] Sipariş kaydediliyor | table={order_values['table_id']} | items={len(items)}")
+        new_order = insert(Order).values(**order_values).returning(Order.id)
+        if not items:
+            await self.session.execute(new_order)
+            await self.session.commit()
+            return
 
+        new_order = new_order.cte("new_order")
+        lines = values(
+            column("menu_item_id", Uuid),
+            column("item_name", String),
+            column("unit_price", Numeric(10, 2)),
+            column("quantity", Integer),
+            name="lines",
+        ).data([(item.menu_item_id, item.item_name, item.unit_price, item.quantity) for item in items])
+        stmt = insert(OrderItem).from_select(
+            ["order_id", "menu_item_id", "item_name", "unit_price", "quantity", "is_active"],
+            select(
+                new_order.c.id,
+                lines.c.menu_item_id,
+                lines.c.item_name,
+                lines.c.unit_price,
+                lines.c.quantity,
+                literal(True),
+            ).select_from(new_order).join(lines, true()),
+            # python-side column defaults can't be rendered into INSERT ... SELECT
+            include_defaults=False,
+        ).add_cte(new_order)
+        await self.session.execute(stmt)
+        await self.session.commit()
 
-    async def get_orders_for_waiter(self, waiter_id) -> List[Order]:
-        stmt = select(Order).where(Order.waiter_id == waiter_id)
+    async def get_by_id(self, order_id: UUID, options: Sequence = ()) -> Order:
+        stmt = select(Order).where(Order.id == order_id).options(*options)
         result = await self.session.execute(stmt)
-        return result.unique().scalars().all()
+        return result.scalar_one_or_none()
+
+    async def _fetch_order_responses(
+        self, *criteria, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> Tuple[List[OrderResponse], Optional[str]]:
+        """
+        Projection read path: one SELECT for the order columns, one batched SELECT for the items.
+
+        With `limit`, returns a newest-first keyset page and the cursor of the next one.
+        """
+        stmt = select(*ORDER_RESPONSE_COLUMNS, Order.created_at).where(*criteria)
+        if limit is not None:
+            stmt = apply_keyset(stmt, Order, limit, cursor, descending=True)
+        rows = (await self.session.execute(stmt)).all()
+        next_cursor = None
+        if limit is not None:
+            rows, next_cursor = split_page(rows, limit)
+        return await self.with_items(rows), next_cursor
+
+    async def with_items(self, rows) -> List[OrderResponse]:
+        """Builds OrderResponses from ORDER_RESPONSE_COLUMNS rows with one batched SELECT for their items."""
+        if not rows:
+            return []
+
+        items_by_order = {row.id: [] for row in rows}
+        items_stmt = select(*ORDER_ITEM_RESPONSE_COLUMNS).where(
+            OrderItem.order_id.in_(list(items_by_order))
+        )
+        for item in (await self.session.execute(items_stmt)).all():
+            items_by_order[item.order_id].append(
+                OrderItemResponse(
+                    menu_item_id=item.menu_item_id,
+                    item_name=item.item_name,
+                    unit_price=item.unit_price,
+                    quantity=item.quantity,
+                    line_total=item.unit_price * item.quantity,
+                )
+            )
+
+        orders = [
+            OrderResponse(
+                id=row.id,
+                table_id=row.table_id,
+                waiter_id=row.waiter_id,
+                status=row.status,
+                special_request=row.special_request,
+                total_amount=row.total_amount,
+                is_paid=row.is_paid,
+                items=items_by_order[row.id],
+            )
+            for row in rows
+        ]
+        return orders
+
+    async def get_orders_for_waiter(
+        self, waiter_id, limit: int, cursor: Optional[str] = None, status: Optional[OrderStatus] = None
+    ) -> Tuple[List[OrderResponse], Optional[str]]:
+        criteria = [Order.waiter_id == waiter_id]
+        if status is not None:
+            criteria.append(Order.status == status)
+        return await self._fetch_order_responses(*criteria, limit=limit, cursor=cursor)
     
-    async def get_orders_by_customer(self, customer_id: UUID) -> List[Order]:
-        stmt = select(Order).where(Order.customer_id == customer_id)
-        result = await self.session.execute(stmt)
-        return result.unique().scalars().all()
+    async def get_orders_by_customer(
+        self, customer_id: UUID, limit: int, cursor: Optional[str] = None, status: Optional[OrderStatus] = None
+    ) -> Tuple[List[OrderResponse], Optional[str]]:
+        criteria = [Order.customer_id == customer_id]
+        if status is not None:
+            criteria.append(Order.status == status)
+        return await self._fetch_order_responses(*criteria, limit=limit, cursor=cursor)
 
-    async def get_orders_for_kitchen(self):
-        stmt = select(Order).where(Order.status.in_(["in_progress", "ready"]))
-        result = await self.session.execute(stmt)
-        orders = result.unique().scalars().all()
-        return orders or []
+    async def stream_orders_by_customer(
+        self,
+        customer_id: UUID,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        status: Optional[OrderStatus] = None,
+    ) -> AsyncIterator[Sequence]:
+        """Yields the customer's order rows in batches from a server-side cursor, oldest first."""
+        stmt = select(*ORDER_EXPORT_COLUMNS).where(Order.customer_id == customer_id)
+        if start_date is not None:
+            stmt = stmt.where(Order.created_at >= start_date)
+        if end_date is not None:
+            stmt = stmt.where(Order.created_at <= end_date)
+        if status is not None:
+            stmt = stmt.where(Order.status == status)
+        stmt = stmt.order_by(Order.created_at, Order.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        result = await self.session.stream(stmt)
+        async for rows in result.partitions():
+            yield rows
 
-    async def update_status(self, order_id: UUID, new_status: str, is_paid: Optional[bool] = None) -> Order:
-        stmt = select(Order).where(Order.id == order_id)
-        result = await self.session.execute(stmt)
-        order = result.unique().scalar_one_or_none()
-        if not order:
-            raise Exception("Order not found")
+    async def get_orders_for_kitchen(self) -> List[OrderResponse]:
+        # Mutfak listesi aktif siparişlerle sınırlı, sayfalanmaz
+        orders, _ = await self._fetch_order_responses(
+            Order.status.in_([OrderStatus.IN_PROGRESS, OrderStatus.READY])
+        )
+        return orders
 
-        order.status = new_status
-        if is_paid is not None:
-            order.is_paid = is_paid
+    async def transition_status(self, order_id: UUID, sources: Sequence[OrderStatus], new_status: OrderStatus, **values):
+        """
+        Compare-and-set: UPDATE ... WHERE id = :id AND status IN (:sources) RETURNING the order.
 
-        await self.session.commit()
-        await self.session.refresh(order)
-        return order
-    async def mark_order_as_paid(self, order_id: UUID) -> Order:
-        return await self.update_status(order_id, "paid", is_paid=True)
\ No newline at end of file
+        Returns None when the order is missing or no longer in one of `sources`, i.e. someone
+        else moved it first. The row also carries previous_waiter_id, the waiter before the
+        update, so a change of waiter can move the roster slot. Does not commit.
+        """
+        stmt = (
+            update(Order)
+            .where(Order.id == order_id, Order.status.in_(sources))
+            .values(status=new_status, **values)
+        )
+        if "waiter_id" in values:
+            # RETURNING yeni değeri verir; eski garson aynı satırın kilitli okumasından gelir
+            previous = (
+                select(Order.id, Order.waiter_id).where(Order.id == order_id).with_for_update().subquery("previous")
+            )
+            stmt = stmt.where(Order.id == previous.c.id)
+            previous_waiter_id = previous.c.waiter_id
+        else:
+            previous_waiter_id = Order.waiter_id
+        stmt = stmt.returning(
+            *ORDER_RESPONSE_COLUMNS, Order.kitchen_staff_id, previous_waiter_id.label("previous_waiter_id")
+        )
+        return (await self.session.execute(stmt)).first()
+
+    async def get_status(self, order_id: UUID) -> Optional[OrderStatus]:
+        stmt = select(Order.status).where(Order.id == order_id)
+        return (await self.session.execute(stmt)).scalar_one_or_none()
+
+    async def lock_for_settlement(self, order_id: UUID):
+        """Locks the order row (FOR UPDATE) so payments on it settle one at a time; None if missing."""
+        stmt = (
+            select(Order.total_amount, Order.paid_amount, Order.is_paid, Order.status, Order.waiter_id)
+            .where(Order.id == order_id)
+            .with_for_update()
+        )
+        return (await self.session.execute(stmt)).first()
+
+    async def record_paid_amount(self, order_id: UUID, paid_amount: Decimal, settle: bool = False):
+        """
+        Stores the order's successful payment sum; balance_due follows as a generated column.
+
+        With settle=True the same UPDATE flips is_paid and status and the order is added
+        onto the sales rollups. Returns (customer_id, table_id, total_amount), or None if
+        the order was already paid. Does not commit: it lands with the payment write.
+        """
+        values = {"paid_amount": paid_amount}
+        criteria = [Order.id == order_id]
+        if settle:
+            # Ödenmemiş -> ödenmiş geçişi tek UPDATE ile yakalanır; özetler bir kez artar
+            values.update(is_paid=True, status=OrderStatus.PAID)
+            criteria.append(Order.is_paid == False)
+        stmt = (
+            update(Order)
+            .where(*criteria)
+            .values(**values)
+            .returning(Order.customer_id, Order.table_id, Order.total_amount)
+        )
+        row = (await self.session.execute(stmt)).first()
+        if settle and row is not None:
+            await SalesRollupRepository(self.session).record_paid_orders([order_id])
+        return row
+
+    async def get_balance(self, order_id: UUID):
+        """Stored totals of the order; no aggregate over its payments."""
+        stmt = select(
+            Order.id.label("order_id"), Order.total_amount, Order.paid_amount, Order.balance_due, Order.is_paid
+        ).where(Order.id == order_id)
+        return (await self.session.execute(stmt)).first()
+
+    async def get_paid_amount_drift(self, limit: int):
+        """Orders whose paid_amount differs from the sum of their successful payments."""
+        paid = (
+            select(Payment.order_id, func.sum(Payment.amount).label("paid"))
+            .where(Payment.is_successful == True)
+            .group_by(Payment.order_id)
+            .subquery()
+        )
+        actual = func.coalesce(paid.c.paid, 0)
+        stmt = (
+            select(Order.id, Order.paid_amount, actual.label("actual"))
+            .outerjoin(paid, paid.c.order_id == Order.id)
+            .where(Order.paid_amount != actual)
+            .limit(limit)
+        )
+        return (await self.session.execute(stmt)).all()
+
+    async def resync_paid_amounts(self, order_ids: Sequence[UUID]) -> None:
+        """Recomputes paid_amount for the given orders; does not commit."""
+        # Önce kilit: canlı bir ödeme commit ederse toplamı ondan sonraki ifade görür
+        await self.session.execute(select(Order.id).where(Order.id.in_(order_ids)).with_for_update())
+        paid = (
+            select(func.coalesce(func.sum(Payment.amount), 0))
+            .where(Payment.order_id == Order.id, Payment.is_successful == True)
+            .scalar_subquery()
+        )
+        await self.session.execute(update(Order).where(Order.id.in_(order_ids)).values(paid_amount=paid))
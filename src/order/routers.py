@@ -1,6 +1,9 @@
 from sqlalchemy import select
 from fastapi import Path
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Response, status, WebSocket
+from typing import Optional
+from datetime import datetime
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 from src.user.dependencies import get_db
@@ -11,15 +14,22 @@ from fastapi import Query, HTTPException
 
 from src.user.dependencies import get_current_user
 from src.db.dependencies import get_db
+from src.db.database import AsyncSession as SessionFactory
+from src.auth.dependencies import get_websocket_token_data
+from src.utils.websockets import stream_channel
 from order.schemas import (
     CreateOrderRequest,
     OrderResponse,
-    OrderStatusUpdateRequest
+    OrderStatusUpdateRequest,
+    OrderStatus,
 )
+from src.utils.pagination import PageParams, set_next_cursor
+from src.utils.streaming import ExportFormat
 from order.repositories import OrderRepository
 
 from order.services import OrderService
-from src.auth.schemas import UserProfileResponse
+from order.events import kitchen_channel
+from src.auth.schemas import UserProfileResponse, UserPrincipal
 router = APIRouter(prefix="/orders", tags=["Orders"])
 
 
@@ -37,19 +47,24 @@ async def create_order(
 
 @router.get("/waiter", response_model=list[OrderResponse])
 async def get_orders_for_waiter(
+    response: Response,
     waiter_id: UUID = Query(..., description="Waiter ID"),
+    status_filter: Optional[OrderStatus] = Query(None, alias="status", description="Filter by status"),
+    page: PageParams = Depends(),
     db: AsyncSession = Depends(get_db)
 ):
     # waiter_id'nin gerçekten var olup olmadığını kontrol et
     waiter = await db.execute(
-        select(User).where(User.id == waiter_id, User.type == "waiter")
+        select(User.id).where(User.id == waiter_id, User.type == "waiter")
     )
     waiter_obj = waiter.scalar_one_or_none()
     if not waiter_obj:
         raise HTTPException(status_code=404, detail="Waiter bulunamadı")
 
     service = OrderService(OrderRepository(db))
-    return await service.get_orders_for_waiter(waiter_id=waiter_id)
+    orders, next_cursor = await service.get_orders_for_waiter(waiter_id=waiter_id, page=page, status=status_filter)
+    set_next_cursor(response, next_cursor)
+    return orders
 
 @router.patch("/waiter/{order_id}", response_model=OrderResponse)
 async def approve_order_by_waiter(
@@ -59,7 +74,7 @@ async def approve_order_by_waiter(
 ):
     # waiter_id geçerliliğini kontrol et
     waiter = await db.execute(
-        select(User).where(User.id == waiter_id, User.type == "waiter")
+        select(User.id).where(User.id == waiter_id, User.type == "waiter")
     )
     waiter_obj = waiter.scalar_one_or_none()
     if not waiter_obj:
@@ -78,21 +93,56 @@ async def get_orders_for_kitchen(
     return await service.get_orders_for_kitchen()
 
 
+@router.websocket("/kitchen/stream")
+async def kitchen_stream(
+    websocket: WebSocket,
+    _token: dict = Depends(get_websocket_token_data),
+):
+    """Mutfak ekranı: bağlanınca anlık görüntü, sonra sadece değişiklikler."""
+
+    async def send_snapshot():
+        # Oturum sadece anlık görüntü için açılır, bağlantı havuza hemen döner
+        async with SessionFactory() as db:
+            orders = await OrderService(OrderRepository(db)).get_orders_for_kitchen()
+        await websocket.send_json({"type": "snapshot", "orders": jsonable_encoder(orders)})
+
+    await stream_channel(websocket, kitchen_channel, send_snapshot)
+
+
 @router.patch("/{order_id}/status", response_model=OrderResponse)
 async def update_order_status(
     order_id: UUID,
     payload: OrderStatusUpdateRequest,
     db: AsyncSession = Depends(get_db),
-    _user: UserProfileResponse = Depends(get_current_user)
+    user: UserPrincipal = Depends(get_current_user)
 ):
     service = OrderService(OrderRepository(db))
-    return await service.update_order_status(order_id=order_id, new_status=payload.new_status)
+    return await service.update_order_status(
+        order_id=order_id, new_status=payload.new_status, expected_status=payload.expected_status, actor=user
+    )
 
 @router.get("/my", response_model=list[OrderResponse])
 async def get_my_orders(
+    response: Response,
+    status_filter: Optional[OrderStatus] = Query(None, alias="status", description="Filter by status"),
+    page: PageParams = Depends(),
     db: AsyncSession = Depends(get_db),
-    user: User = Depends(get_current_customer)
+    user: UserPrincipal = Depends(get_current_customer)
 ):
     service = OrderService(OrderRepository(db))
-    return await service.get_orders_for_customer(user.id)
+    orders, next_cursor = await service.get_orders_for_customer(user.id, page=page, status=status_filter)
+    set_next_cursor(response, next_cursor)
+    return orders
+
 
+@router.get("/my/export")
+async def export_my_orders(
+    format: ExportFormat = Query(ExportFormat.CSV, description="csv or ndjson"),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    status_filter: Optional[OrderStatus] = Query(None, alias="status", description="Filter by status"),
+    db: AsyncSession = Depends(get_db),
+    user: UserPrincipal = Depends(get_current_customer)
+):
+    service = OrderService(OrderRepository(db))
+    return service.export_orders_for_customer(user.id, format, start_date, end_date, status_filter)
@@ -30,6 +30,9 @@ class CreateOrderRequest(BaseModel):
 class OrderItemResponse(OrderItemCreate):
     line_total: Decimal
 
+    class Config:
+        from_attributes = True
+
 
 class OrderResponse(BaseModel):
     id: UUID
@@ -47,3 +50,5 @@ class OrderResponse(BaseModel):
 
 class OrderStatusUpdateRequest(BaseModel):
     new_status: OrderStatus
+    # verilirse geçiş yalnızca sipariş hâlâ bu durumdaysa yapılır (aksi halde 409)
+    expected_status: Optional[OrderStatus] = None
@@ -1,13 +1,22 @@
 
 from fastapi import HTTPException
-from order.repositories import OrderRepository
-from order.schemas import CreateOrderRequest, OrderStatusUpdateRequest
-from uuid import UUID
+from fastapi.responses import StreamingResponse
+from order.repositories import ORDER_EXPORT_COLUMNS, OrderRepository
+from order.schemas import CreateOrderRequest, OrderStatusUpdateRequest, OrderResponse, OrderItemResponse
+from order.utils import calculate_total_amount
+from uuid import UUID, uuid4
+from datetime import datetime
+from typing import Optional
+from src.utils.pagination import PageParams
+from src.utils.streaming import ExportFormat, export_response, stream_in_own_session
 from loguru import logger
-import random
-from src.db.models import Order, OrderItem, User
-from sqlalchemy import select, func
 from src.order.enums import OrderStatus
+from src.order.assignment import waiter_assigner, OPEN_STATUSES
+from src.order.transitions import resolve_transition
+from src.table.repositories import TableRepository
+from src.events.relay import outbox_relay
+from src.events.repositories import OutboxRepository
+from src.auth.schemas import UserPrincipal
 
 
 class OrderService:
@@ -15,80 +24,129 @@ class OrderService:
         self.db = db
 
     async def create(self, customer_id: UUID, request: CreateOrderRequest):
-         # Rastgele waiter seç
-        stmt = select(User).where(User.type == "waiter")
-        result = await self.db.session.execute(stmt)
-        waiters = result.unique().scalars().all()
-
-
-        if not waiters:
+        # Garson Redis'teki kadrodan seçilir, ORM'e dokunulmaz
+        waiter_id = await waiter_assigner.assign(self.db.session, request.table_id)
+        if not waiter_id:
             raise HTTPException(status_code=404, detail="Hiç garson bulunamadı")
 
-        random_waiter = random.choice(waiters)
-
-        order = Order(
-            customer_id=customer_id,
-            waiter_id=random_waiter.id,
-            table_id=request.table_id,
-            special_request=request.special_request,
-            status=OrderStatus.NEW,
-            is_paid=False,
+        order_values = {
+            "id": uuid4(),
+            "customer_id": customer_id,
+            "waiter_id": waiter_id,
+            "table_id": request.table_id,
+            "special_request": request.special_request,
+            "status": OrderStatus.NEW,
+            "total_amount": calculate_total_amount(request.items),
+            "is_paid": False,
+            "is_active": True,
+        }
+
+        # Yanıt girdilerden kurulur, grafiği tekrar okumaya gerek yok
+        order = OrderResponse(
+            id=order_values["id"],
+            table_id=order_values["table_id"],
+            waiter_id=order_values["waiter_id"],
+            status=order_values["status"],
+            special_request=order_values["special_request"],
+            total_amount=order_values["total_amount"],
+            is_paid=order_values["is_paid"],
+            items=[
+                OrderItemResponse(**item.model_dump(), line_total=item.unit_price * item.quantity)
+                for item in request.items
+            ],
         )
 
-        for item in request.items:
-            order_item = OrderItem(
-                menu_item_id=item.menu_item_id,
-                item_name=item.item_name,
-                unit_price=item.unit_price,
-                quantity=item.quantity,
-            )
-            order.items.append(order_item)
-
-        order.recalc_total()
-
         try:
             logger.info(f"[Service] Sipariş oluşturuluyor | customer={customer_id} | table={request.table_id}")
-            return await self.db.insert(order)
+            # Masa siparişle birlikte dolu işaretlenir, close_table boşaltır
+            await TableRepository(self.db.session).mark_occupied(request.table_id)
+            # Olay siparişle aynı commit'te yazılır; sayaç, masa panosu ve mutfak ekranı tüketicilerde güncellenir
+            OutboxRepository(self.db.session).add("order.created", order.id, {"order": order})
+            await self.db.insert_with_items(order_values, request.items)
     
         except Exception as e:
             logger.exception(f"💥 Sipariş oluşturulamadı | Hata: {e}")
+            await waiter_assigner.release(waiter_id)
             raise HTTPException(status_code=500, detail="Sipariş oluşturulamadı")
+
+        outbox_relay.wake()
+        return order
         
     
 
-    async def get_orders_for_waiter(self, waiter_id: UUID,):
-        return await self.db.get_orders_for_waiter(waiter_id)
+    async def get_orders_for_waiter(self, waiter_id: UUID, page: PageParams, status: Optional[OrderStatus] = None):
+        return await self.db.get_orders_for_waiter(waiter_id, page.limit, page.cursor, status)
         
     
-    async def get_orders_for_customer(self, customer_id: UUID):
+    async def get_orders_for_customer(self, customer_id: UUID, page: PageParams, status: Optional[OrderStatus] = None):
         """Müşterinin kendi verdiği siparişleri getirir."""
-        return await self.db.get_orders_by_customer(customer_id)
+        return await self.db.get_orders_by_customer(customer_id, page.limit, page.cursor, status)
     
-    async def approve_order(self, order_id: UUID, waiter_id: UUID):
-        order = await self.db.get_by_id(order_id)
-        order.status = OrderStatus.READY
-        logger.info(f"Sipariş durumu: {order.status}")
+    def export_orders_for_customer(
+        self,
+        customer_id: UUID,
+        export_format: ExportFormat,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        status: Optional[OrderStatus] = None,
+    ) -> StreamingResponse:
+        """Müşterinin sipariş geçmişini CSV/NDJSON olarak akıtır."""
+        partitions = stream_in_own_session(
+            lambda session: OrderRepository(session).stream_orders_by_customer(customer_id, start_date, end_date, status)
+        )
+        columns = [column.key for column in ORDER_EXPORT_COLUMNS]
+        return export_response(columns, partitions, export_format, "order_history")
 
-        if not order:
-            raise HTTPException(status_code=404, detail="Sipariş bulunamadı")
-        if order.status != "ready":
-            raise HTTPException(status_code=400, detail="Bu sipariş zaten onaylanmış veya geçersiz durumda")
-        order.status = OrderStatus.IN_PROGRESS  # mutfağa düşer
-        order.waiter_id = waiter_id
-        await self.db.session.commit()
-        await self.db.session.refresh(order)
-        return order
+    async def approve_order(self, order_id: UUID, waiter_id: UUID):
+        # Garson onayı: NEW -> IN_PROGRESS, sipariş mutfağa düşer
+        return await self._transition(order_id, OrderStatus.IN_PROGRESS, waiter_id=waiter_id)
 
 
     async def get_orders_for_kitchen(self):
         orders = await self.db.get_orders_for_kitchen()
         return orders or []
 
-    async def update_order_status(self, order_id: UUID, new_status: str):
-        order = await self.db.get_by_id(order_id)
-        if not order:
-            raise HTTPException(status_code=404, detail="Order not found")
-        order.status = new_status
+    async def update_order_status(
+        self,
+        order_id: UUID,
+        new_status: OrderStatus,
+        expected_status: Optional[OrderStatus] = None,
+        actor: Optional[UserPrincipal] = None,
+    ):
+        values = {}
+        # Siparişi hazır eden mutfak personeli kaydedilir; hazırlanan sipariş sayacı buna bağlı
+        if new_status == OrderStatus.READY and actor is not None and actor.type == "kitchen_staff":
+            values["kitchen_staff_id"] = actor.id
+        return await self._transition(order_id, new_status, expected_status, **values)
+
+    async def _transition(
+        self, order_id: UUID, new_status: OrderStatus, expected_status: Optional[OrderStatus] = None, **values
+    ) -> OrderResponse:
+        """One compare-and-set UPDATE per button press; 404 if the order is missing, 409 if it moved on."""
+        sources, event = resolve_transition(new_status, expected_status)
+        row = await self.db.transition_status(order_id, sources, new_status, **values)
+        if row is None:
+            current = await self.db.get_status(order_id)
+            await self.db.session.rollback()
+            if current is None:
+                raise HTTPException(status_code=404, detail="Sipariş bulunamadı")
+            raise HTTPException(
+                status_code=409,
+                detail=f"Sipariş '{current.value}' durumunda, '{new_status.value}' yapılamaz",
+            )
+        order = (await self.db.with_items([row]))[0]
+        OutboxRepository(self.db.session).add(
+            event, order_id, {"order": order, "kitchen_staff_id": row.kitchen_staff_id}
+        )
         await self.db.session.commit()
-        await self.db.session.refresh(order)
+        outbox_relay.wake()
+        logger.info(f"Sipariş durumu: {order_id} -> {new_status.value}")
+
+        if row.previous_waiter_id != row.waiter_id:
+            # Onaylayan garson siparişi devraldı: açık sipariş yükü eski garsondan yenisine geçer
+            await waiter_assigner.release(row.previous_waiter_id)
+            await waiter_assigner.book(row.waiter_id)
+        # Geçiş tablosunda SERVED/CANCELED yalnızca açık durumlardan gelir
+        if new_status not in OPEN_STATUSES:
+            await waiter_assigner.release(row.waiter_id)
         return order
@@ -0,0 +1,40 @@
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+
+from src.order.enums import OrderStatus
+
+
+class Transition(NamedTuple):
+    sources: Tuple[OrderStatus, ...]  # durumlar bunlardan birindeyken geçiş yapılabilir
+    event: str                        # geçiş başarılı olunca yayınlanan olay
+
+
+# Hedef durum -> geçiş. NEW başlangıç durumudur; PAID yalnızca ödeme ile (SettlementEngine) gelir.
+TRANSITIONS: Dict[OrderStatus, Transition] = {
+    OrderStatus.IN_PROGRESS: Transition((OrderStatus.NEW,), "order.accepted"),
+    OrderStatus.READY: Transition((OrderStatus.IN_PROGRESS,), "order.ready"),
+    OrderStatus.SERVED: Transition((OrderStatus.READY,), "order.served"),
+    OrderStatus.CANCELED: Transition(
+        (OrderStatus.NEW, OrderStatus.IN_PROGRESS, OrderStatus.READY), "order.canceled"
+    ),
+}
+
+
+def resolve_transition(
+    new_status: OrderStatus, expected: Optional[OrderStatus] = None
+) -> Tuple[Tuple[OrderStatus, ...], str]:
+    """
+    Returns (statuses the UPDATE may match, event name) for a move to `new_status`.
+
+    With `expected` the compare-and-set matches that status only, so a client acting on a
+    stale screen gets a conflict instead of overwriting someone else's change.
+    """
+    transition = TRANSITIONS.get(new_status)
+    if transition is None:
+        raise HTTPException(400, f"Sipariş elle '{new_status.value}' durumuna alınamaz")
+    if expected is None:
+        return transition.sources, transition.event
+    if expected not in transition.sources:
+        raise HTTPException(409, f"'{expected.value}' durumundan '{new_status.value}' durumuna geçilemez")
+    return (expected,), transition.event
@@ -0,0 +1,58 @@
+"""
+Checks that every order's stored paid_amount matches the sum of its successful payments.
+
+    python -m src.payment.reconcile [--fix] [--batch-size 500]
+
+SettlementEngine keeps paid_amount exact on every payment write; drift only comes from
+writes that bypass it (manual SQL, restored dumps). Without --fix the job only reports
+and exits non-zero when it finds drift, so it can run from cron as a check. With --fix
+each batch is recomputed under the order row locks, safe while payments are coming in.
+"""
+import argparse
+import asyncio
+import sys
+
+from loguru import logger
+
+from src.db.database import AsyncSession, async_engine
+from order.repositories import OrderRepository
+
+RECONCILE_BATCH_SIZE = 500
+
+
+async def reconcile_paid_amounts(fix: bool = False, batch_size: int = RECONCILE_BATCH_SIZE) -> int:
+    """Returns the number of drifted orders found (and repaired when `fix`)."""
+    found = 0
+    async with AsyncSession() as session:
+        repo = OrderRepository(session)
+        while True:
+            drift = await repo.get_paid_amount_drift(batch_size)
+            for row in drift:
+                logger.warning(f"Reconcile: order={row.id} | stored={row.paid_amount} | payments={row.actual}")
+            found += len(drift)
+            if not fix or not drift:
+                break
+            # Her parti kendi transaction'ında; düzeltilen siparişler bir sonraki sorguda çıkmaz
+            await repo.resync_paid_amounts([row.id for row in drift])
+            await session.commit()
+            if len(drift) < batch_size:
+                break
+
+    logger.info(f"Reconcile finished: {found} orders {'repaired' if fix else 'drifted'}")
+    return found
+
+
+async def main(fix: bool, batch_size: int) -> int:
+    try:
+        return await reconcile_paid_amounts(fix, batch_size)
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fix", action="store_true", help="recompute paid_amount for drifted orders")
+    parser.add_argument("--batch-size", type=int, default=RECONCILE_BATCH_SIZE)
+    args = parser.parse_args()
+    drifted = asyncio.run(main(args.fix, args.batch_size))
+    sys.exit(1 if drifted and not args.fix else 0)
@@ -1,15 +1,29 @@
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List, Sequence, Tuple
 from uuid import UUID
 from decimal import Decimal
 from datetime import datetime
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func
+from sqlalchemy import delete, func, update
+from sqlalchemy.dialects.postgresql import insert
 
 from src.db.database import Base
-from src.db.models import Payment  
+from src.db.models import Payment, PaymentMethod
 from src.utils.base_repository import BaseRepository  
+from src.utils.streaming import EXPORT_BATCH_SIZE
+
+
+# Dışa aktarımda ORM nesnesi yerine düz kolonlar okunur — ilişkiler yüklenmez
+PAYMENT_EXPORT_COLUMNS = (
+    Payment.id,
+    Payment.order_id,
+    Payment.customer_id,
+    Payment.amount,
+    Payment.method,
+    Payment.is_successful,
+    Payment.paid_at,
+)
 
 
 class PaymentRepository(BaseRepository[Payment]):
@@ -21,30 +35,98 @@ class PaymentRepository(BaseRepository[Payment]):
         result = await self.session.execute(stmt)
         return result.scalars().all()
 
-    async def get_payments_by_customer(self, customer_id: UUID) -> List[Payment]:
-        stmt = select(Payment).where(Payment.customer_id == customer_id)
-        result = await self.session.execute(stmt)
-        return result.scalars().all()
+    async def get_payments_by_customer(
+        self, customer_id: UUID, limit: int, cursor: Optional[str] = None, method: Optional[PaymentMethod] = None
+    ) -> Tuple[List[Payment], Optional[str]]:
+        filters = [Payment.customer_id == customer_id]
+        if method is not None:
+            filters.append(Payment.method == method)
+        return await self.get_page(limit, cursor, filters=filters, descending=True)
 
     async def get_total_payments_for_order(self, order_id: UUID) -> Decimal:
+        """Sums the order's successful payments; readers use the order's stored paid_amount instead."""
         stmt = select(func.coalesce(func.sum(Payment.amount), 0)).where(
             Payment.order_id == order_id, Payment.is_successful == True
         )
         result = await self.session.execute(stmt)
         return result.scalar()
 
-    async def get_successful_payments(self) -> List[Payment]:
-        stmt = select(Payment).where(Payment.is_successful == True)
-        result = await self.session.execute(stmt)
-        return result.scalars().all()
+    async def get_order_id(self, payment_id: UUID) -> Optional[UUID]:
+        stmt = select(Payment.order_id).where(Payment.id == payment_id)
+        return (await self.session.execute(stmt)).scalar_one_or_none()
+
+    async def get_by_idempotency_key(self, idempotency_key: str):
+        stmt = select(*Payment.__table__.c).where(Payment.idempotency_key == idempotency_key)
+        return (await self.session.execute(stmt)).first()
+
+    async def insert_payment(self, values: dict, idempotency_key: Optional[str] = None):
+        """
+        INSERT ... ON CONFLICT (idempotency_key) DO NOTHING RETURNING the row.
+
+        Returns None when a payment with the same key already exists. Rows are plain
+        columns, so they outlive the commit. Does not commit.
+        """
+        stmt = (
+            insert(Payment)
+            .values(**values, idempotency_key=idempotency_key)
+            .on_conflict_do_nothing(index_elements=[Payment.idempotency_key])
+            .returning(*Payment.__table__.c)
+        )
+        return (await self.session.execute(stmt)).first()
+
+    async def update_payment(self, payment_id: UUID, values: dict):
+        """UPDATE ... RETURNING the row; does not commit."""
+        stmt = (
+            update(Payment)
+            .where(Payment.id == payment_id)
+            .values(**values)
+            .returning(*Payment.__table__.c)
+            .execution_options(synchronize_session=False)
+        )
+        return (await self.session.execute(stmt)).first()
+
+    async def delete_payment(self, payment_id: UUID) -> Optional[bool]:
+        """DELETE ... RETURNING is_successful; None if there was no such payment. Does not commit."""
+        stmt = delete(Payment).where(Payment.id == payment_id).returning(Payment.is_successful)
+        return (await self.session.execute(stmt)).scalar_one_or_none()
+
+    async def get_successful_payments(
+        self, limit: int, cursor: Optional[str] = None, method: Optional[PaymentMethod] = None
+    ) -> Tuple[List[Payment], Optional[str]]:
+        filters = [Payment.is_successful == True]
+        if method is not None:
+            filters.append(Payment.method == method)
+        return await self.get_page(limit, cursor, filters=filters, descending=True)
 
     async def get_payments_in_date_range(
-        self, start_date: datetime, end_date: datetime
-    ) -> List[Payment]:
-        stmt = select(Payment).where(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        limit: int,
+        cursor: Optional[str] = None,
+        method: Optional[PaymentMethod] = None,
+    ) -> Tuple[List[Payment], Optional[str]]:
+        filters = [
+            Payment.paid_at >= start_date,
+            Payment.paid_at <= end_date,
+            Payment.is_successful == True
+        ]
+        if method is not None:
+            filters.append(Payment.method == method)
+        return await self.get_page(limit, cursor, filters=filters, descending=True)
+
+    async def stream_payments_in_date_range(
+        self, start_date: datetime, end_date: datetime, method: Optional[PaymentMethod] = None
+    ) -> AsyncIterator[Sequence]:
+        """Yields row batches from a server-side cursor, oldest first."""
+        stmt = select(*PAYMENT_EXPORT_COLUMNS).where(
             Payment.paid_at >= start_date,
             Payment.paid_at <= end_date,
             Payment.is_successful == True
         )
-        result = await self.session.execute(stmt)
-        return result.scalars().all()
+        if method is not None:
+            stmt = stmt.where(Payment.method == method)
+        stmt = stmt.order_by(Payment.paid_at, Payment.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        result = await self.session.stream(stmt)
+        async for rows in result.partitions():
+            yield rows
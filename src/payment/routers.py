@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
 
-from src.payment.schemas import PaymentCreate, PaymentUpdate, PaymentRead
+from src.payment.schemas import OrderBalance, PaymentCreate, PaymentUpdate, PaymentRead
 from src.payment.services import PaymentService
+from src.db.models import PaymentMethod
+from src.utils.pagination import PageParams, set_next_cursor
+from src.utils.streaming import ExportFormat
 from src.db.dependencies import get_db
 from src.auth.dependencies import get_current_user
 from src.auth.schemas import UserProfileResponse
@@ -22,13 +25,69 @@ def get_payment_service(session: AsyncSession = Depends(get_db)) -> PaymentServi
 @router.post("/", response_model=PaymentRead, status_code=status.HTTP_201_CREATED)
 async def create_payment(
     payment_in: PaymentCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=64),
     service: PaymentService = Depends(get_payment_service),
     user: UserProfileResponse = Depends(get_current_user)  
 ):
-    payment = await service.create_payment(payment_in)
+    payment = await service.create_payment(payment_in, idempotency_key)
     return payment
 
 
+@router.get("/customer/{customer_id}", response_model=List[PaymentRead])
+async def get_payments_by_customer(
+    customer_id: UUID,
+    response: Response,
+    method: Optional[PaymentMethod] = Query(None, description="Filter by payment method"),
+    page: PageParams = Depends(),
+    service: PaymentService = Depends(get_payment_service),
+    user: UserProfileResponse = Depends(get_current_user)
+):
+    payments, next_cursor = await service.get_payments_by_customer(customer_id, page, method)
+    set_next_cursor(response, next_cursor)
+    return payments
+
+
+# Sabit yollar "/{payment_id}" rotasından önce tanımlanmalı, yoksa UUID doğrulamasına takılırlar
+@router.get("/successful", response_model=List[PaymentRead])
+async def get_successful_payments(
+    response: Response,
+    method: Optional[PaymentMethod] = Query(None, description="Filter by payment method"),
+    page: PageParams = Depends(),
+    service: PaymentService = Depends(get_payment_service),
+    user: UserProfileResponse = Depends(get_current_user)
+):
+    payments, next_cursor = await service.get_successful_payments(page, method)
+    set_next_cursor(response, next_cursor)
+    return payments
+
+
+@router.get("/range", response_model=List[PaymentRead])
+async def get_payments_in_date_range(
+    start_date: datetime,
+    end_date: datetime,
+    response: Response,
+    method: Optional[PaymentMethod] = Query(None, description="Filter by payment method"),
+    page: PageParams = Depends(),
+    service: PaymentService = Depends(get_payment_service),
+    user: UserProfileResponse = Depends(get_current_user)
+):
+    payments, next_cursor = await service.get_payments_in_date_range(start_date, end_date, page, method)
+    set_next_cursor(response, next_cursor)
+    return payments
+
+
+@router.get("/range/export")
+async def export_payments_in_date_range(
+    start_date: datetime,
+    end_date: datetime,
+    format: ExportFormat = Query(ExportFormat.CSV, description="csv or ndjson"),
+    method: Optional[PaymentMethod] = Query(None, description="Filter by payment method"),
+    service: PaymentService = Depends(get_payment_service),
+    user: UserProfileResponse = Depends(get_current_user)
+):
+    return service.export_payments_in_date_range(start_date, end_date, format, method)
+
+
 @router.get("/{payment_id}", response_model=PaymentRead)
 async def get_payment_by_id(
     payment_id: UUID,
@@ -76,15 +135,6 @@ async def get_payments_by_order(
     return await service.get_payments_by_order(order_id)
 
 
-@router.get("/customer/{customer_id}", response_model=List[PaymentRead])
-async def get_payments_by_customer(
-    customer_id: UUID,
-    service: PaymentService = Depends(get_payment_service),
-    user: UserProfileResponse = Depends(get_current_user)
-):
-    return await service.get_payments_by_customer(customer_id)
-
-
 @router.get("/order/{order_id}/total", response_model=float)
 async def get_total_paid_for_order(
     order_id: UUID,
@@ -92,22 +142,13 @@ async def get_total_paid_for_order(
     user: UserProfileResponse = Depends(get_current_user)
 ):
     total = await service.get_total_paid_for_order(order_id)
-    return float(total) 
+    return float(total)
 
 
-@router.get("/successful", response_model=List[PaymentRead])
-async def get_successful_payments(
-    service: PaymentService = Depends(get_payment_service),
-    user: UserProfileResponse = Depends(get_current_user)
-):
-    return await service.get_successful_payments()
-
-
-@router.get("/range", response_model=List[PaymentRead])
-async def get_payments_in_date_range(
-    start_date: datetime,
-    end_date: datetime,
+@router.get("/order/{order_id}/balance", response_model=OrderBalance)
+async def get_order_balance(
+    order_id: UUID,
     service: PaymentService = Depends(get_payment_service),
     user: UserProfileResponse = Depends(get_current_user)
 ):
-    return await service.get_payments_in_date_range(start_date, end_date)
+    return await service.get_order_balance(order_id)
@@ -42,3 +42,15 @@ class PaymentRead(PaymentBase):
 
     class Config:
         orm_mode = True
+
+
+# Siparişin ödeme durumu; sipariş satırında tutulan toplamlardan okunur
+class OrderBalance(BaseModel):
+    order_id: UUID
+    total_amount: Decimal
+    paid_amount: Decimal
+    balance_due: Decimal
+    is_paid: bool
+
+    class Config:
+        from_attributes = True
@@ -1,56 +1,76 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from uuid import UUID
 from datetime import datetime
 from decimal import Decimal
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.payment.repositories import PaymentRepository
-from src.order.repositories import OrderRepository
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from src.payment.repositories import PAYMENT_EXPORT_COLUMNS, PaymentRepository
 from src.payment.schemas import PaymentCreate, PaymentUpdate
-from src.db.models import Payment
+from src.payment.settlement import SettlementEngine
+from order.repositories import OrderRepository
+from src.db.models import Payment, PaymentMethod
+from src.utils.pagination import PageParams
+from src.utils.streaming import ExportFormat, export_response, stream_in_own_session
 
 
 class PaymentService:
     def __init__(self, session: AsyncSession):
         self.session = session
         self.payment_repo = PaymentRepository(session)
-        self.order_repo = OrderRepository(session)
-
-    async def create_payment(self, data: PaymentCreate) -> Payment:
-        payment = await self.payment_repo.create(data)
-
-        if data.is_successful:
-            await self.order_repo.mark_order_as_paid(data.order_id)
-
-        return payment
 
-    async def update_payment(self, payment_id: UUID, data: PaymentUpdate) -> Optional[Payment]:
-        payment = await self.payment_repo.update(payment_id, data)
+    async def create_payment(self, data: PaymentCreate, idempotency_key: Optional[str] = None):
+        # Ödeme, bakiye kontrolü ve sipariş kapanışı tek transaction'da
+        return await SettlementEngine(self.session).pay(data, idempotency_key)
 
-        # Check if payment became successful after update
-        if data.is_successful:
-            await self.order_repo.mark_order_as_paid(payment.order_id)
-
-        return payment
+    async def update_payment(self, payment_id: UUID, data: PaymentUpdate):
+        return await SettlementEngine(self.session).amend(payment_id, data)
 
     async def get_payment_by_id(self, payment_id: UUID) -> Optional[Payment]:
         return await self.payment_repo.get_by_id(payment_id)
 
     async def delete_payment(self, payment_id: UUID) -> bool:
-        return await self.payment_repo.delete(payment_id)
+        return await SettlementEngine(self.session).remove(payment_id)
 
     async def get_payments_by_order(self, order_id: UUID) -> List[Payment]:
         return await self.payment_repo.get_payments_by_order(order_id)
 
-    async def get_payments_by_customer(self, customer_id: UUID) -> List[Payment]:
-        return await self.payment_repo.get_payments_by_customer(customer_id)
-
-    async def get_total_paid_for_order(self, order_id: UUID) -> Decimal:
-        return await self.payment_repo.get_total_payments_for_order(order_id)
+    async def get_payments_by_customer(
+        self, customer_id: UUID, page: PageParams, method: Optional[PaymentMethod] = None
+    ) -> Tuple[List[Payment], Optional[str]]:
+        return await self.payment_repo.get_payments_by_customer(customer_id, page.limit, page.cursor, method)
 
-    async def get_successful_payments(self) -> List[Payment]:
-        return await self.payment_repo.get_successful_payments()
+    async def get_order_balance(self, order_id: UUID):
+        # Siparişte tutulan toplamlar okunur, ödemeler toplanmaz
+        balance = await OrderRepository(self.session).get_balance(order_id)
+        if balance is None:
+            raise HTTPException(404, "Sipariş bulunamadı")
+        return balance
 
-    async def get_payments_in_date_range(self, start_date: datetime, end_date: datetime) -> List[Payment]:
-        return await self.payment_repo.get_payments_in_date_range(start_date, end_date)
+    async def get_total_paid_for_order(self, order_id: UUID) -> Decimal:
+        return (await self.get_order_balance(order_id)).paid_amount
+
+    async def get_successful_payments(
+        self, page: PageParams, method: Optional[PaymentMethod] = None
+    ) -> Tuple[List[Payment], Optional[str]]:
+        return await self.payment_repo.get_successful_payments(page.limit, page.cursor, method)
+
+    async def get_payments_in_date_range(
+        self, start_date: datetime, end_date: datetime, page: PageParams, method: Optional[PaymentMethod] = None
+    ) -> Tuple[List[Payment], Optional[str]]:
+        return await self.payment_repo.get_payments_in_date_range(
+            start_date, end_date, page.limit, page.cursor, method
+        )
+
+    def export_payments_in_date_range(
+        self, start_date: datetime, end_date: datetime, export_format: ExportFormat, method: Optional[PaymentMethod] = None
+    ) -> StreamingResponse:
+        partitions = stream_in_own_session(
+            lambda session: PaymentRepository(session).stream_payments_in_date_range(start_date, end_date, method)
+        )
+        columns = [column.key for column in PAYMENT_EXPORT_COLUMNS]
+        filename = f"payments_{start_date:%Y%m%d}_{end_date:%Y%m%d}"
+        return export_response(columns, partitions, export_format, filename)
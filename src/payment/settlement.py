@@ -0,0 +1,154 @@
+from decimal import Decimal
+from typing import Optional
+from uuid import UUID
+
+from fastapi import HTTPException
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import OrderStatus
+from src.payment.repositories import PaymentRepository
+from src.payment.schemas import PaymentCreate, PaymentUpdate
+from src.events.relay import outbox_relay
+from src.events.repositories import OutboxRepository
+from src.order.assignment import OPEN_STATUSES, waiter_assigner
+from order.repositories import OrderRepository
+
+
+class SettlementEngine:
+    """
+    Writes payments and settles their order in the same transaction.
+
+    Every write locks the order row first, so split payments on one bill run one at a
+    time and the order's stored paid_amount is exact under the lock: a new payment adds
+    onto it, an edit or delete recomputes it with one aggregate in a statement after the
+    lock. Once successful payments cover `Order.total_amount`, paid_amount, is_paid,
+    status and the sales rollup change in the same commit as the payment. Readers take
+    paid_amount/balance_due from the order row instead of summing payments. The payment
+    and order.paid events go to the outbox in that commit too; stats, the floor board
+    and the receipt email follow from there. Settling an order that was still open
+    frees its waiter's slot in the roster after the commit.
+
+    A payment with an Idempotency-Key is written once: a retry with the same key gets
+    the stored payment back instead of a second row.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.payment_repo = PaymentRepository(session)
+        self.order_repo = OrderRepository(session)
+        self.outbox = OutboxRepository(session)
+        self._freed_waiter: Optional[UUID] = None
+
+    async def _lock_order(self, order_id: UUID):
+        order = await self.order_repo.lock_for_settlement(order_id)
+        if order is None:
+            await self.session.rollback()
+            raise HTTPException(404, "Sipariş bulunamadı")
+        return order
+
+    async def _replay(self, existing, data: PaymentCreate):
+        await self.session.rollback()
+        if existing.order_id != data.order_id or existing.amount != data.amount:
+            raise HTTPException(409, "Idempotency-Key başka bir ödeme için kullanılmış")
+        logger.info(f"Payment replayed | payment={existing.id} | order={existing.order_id}")
+        return existing
+
+    async def _abort(self, status_code: int, detail: str):
+        await self.session.rollback()
+        raise HTTPException(status_code, detail)
+
+    async def _record_paid(self, order_id: UUID, order, paid: Decimal):
+        """Stores the new paid sum and settles the order once it is covered; queues order.paid when it does."""
+        settle = not order.is_paid and order.status != OrderStatus.CANCELED and paid >= order.total_amount
+        newly_paid = await self.order_repo.record_paid_amount(order_id, paid, settle=settle)
+        if settle and newly_paid is not None:
+            self.outbox.add("order.paid", order_id, {
+                "table_id": newly_paid.table_id,
+                "customer_id": newly_paid.customer_id,
+                "total_amount": newly_paid.total_amount,
+            })
+            # Açık siparişi ödeme kapattı; garsonun yükü commit'ten sonra düşer
+            if order.status in OPEN_STATUSES:
+                self._freed_waiter = order.waiter_id
+
+    def _payment_event(self, event_type: str, order_id: UUID, payment_id: UUID, **fields):
+        self.outbox.add(event_type, order_id, {"payment_id": payment_id, **fields})
+
+    async def _commit(self):
+        await self.session.commit()
+        outbox_relay.wake()
+        if self._freed_waiter is not None:
+            await waiter_assigner.release(self._freed_waiter)
+            self._freed_waiter = None
+
+    async def pay(self, data: PaymentCreate, idempotency_key: Optional[str] = None):
+        order = await self._lock_order(data.order_id)
+        if idempotency_key:
+            existing = await self.payment_repo.get_by_idempotency_key(idempotency_key)
+            if existing is not None:
+                return await self._replay(existing, data)
+
+        if data.is_successful:
+            if order.status == OrderStatus.CANCELED:
+                await self._abort(400, "İptal edilmiş siparişe ödeme alınamaz")
+            paid = order.paid_amount + data.amount
+            if paid > order.total_amount:
+                await self._abort(400, "Ödeme tutarı kalan bakiyeyi aşıyor")
+
+        payment = await self.payment_repo.insert_payment(data.model_dump(), idempotency_key)
+        if payment is None:
+            # Aynı anahtarla eşzamanlı istek önce commit etti
+            return await self._replay(await self.payment_repo.get_by_idempotency_key(idempotency_key), data)
+
+        if data.is_successful:
+            await self._record_paid(data.order_id, order, paid)
+        self._payment_event(
+            "payment.recorded", data.order_id, payment.id, amount=data.amount, is_successful=data.is_successful
+        )
+        await self._commit()
+        return payment
+
+    async def amend(self, payment_id: UUID, data: PaymentUpdate):
+        """Applies a payment update and settles the order if it is now covered; None if no such payment."""
+        order_id = await self.payment_repo.get_order_id(payment_id)
+        if order_id is None:
+            return None
+        order = await self._lock_order(order_id)
+        changes = data.model_dump(exclude_unset=True)
+        if order.is_paid and ({"amount", "is_successful"} & changes.keys()):
+            await self._abort(400, "Ödenmiş siparişin ödemeleri değiştirilemez")
+        if not changes:
+            await self.session.rollback()
+            return await self.payment_repo.get_by_id(payment_id)
+
+        payment = await self.payment_repo.update_payment(payment_id, changes)
+        paid = await self.payment_repo.get_total_payments_for_order(order_id)
+        if order.status == OrderStatus.CANCELED and paid > order.paid_amount:
+            await self._abort(400, "İptal edilmiş siparişe ödeme alınamaz")
+        if paid > order.total_amount:
+            await self._abort(400, "Ödeme tutarı kalan bakiyeyi aşıyor")
+
+        await self._record_paid(order_id, order, paid)
+        self._payment_event("payment.updated", order_id, payment_id, **changes)
+        await self._commit()
+        return payment
+
+    async def remove(self, payment_id: UUID) -> bool:
+        """Deletes a payment and recomputes its order's paid sum; False if no such payment."""
+        order_id = await self.payment_repo.get_order_id(payment_id)
+        if order_id is None:
+            return False
+        order = await self._lock_order(order_id)
+        was_successful = await self.payment_repo.delete_payment(payment_id)
+        if was_successful is None:
+            await self.session.rollback()
+            return False
+        if order.is_paid and was_successful:
+            await self._abort(400, "Ödenmiş siparişin ödemeleri değiştirilemez")
+        if was_successful:
+            paid = await self.payment_repo.get_total_payments_for_order(order_id)
+            await self.order_repo.record_paid_amount(order_id, paid)
+        self._payment_event("payment.deleted", order_id, payment_id, is_successful=was_successful)
+        await self._commit()
+        return True
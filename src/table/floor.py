@@ -0,0 +1,173 @@
+from decimal import Decimal
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from loguru import logger
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from src.core.redis_manager import PubSubChannel, get_redis
+from src.core.settings import settings
+from src.db.models import Order, OrderStatus, RestaurantTable
+from src.table.schemas import FloorTableResponse
+
+IDS_KEY = "floor:ids"            # SET of table ids on the board
+TABLE_KEY = "floor:table:{}"     # HASH per table, see FloorState
+READY_KEY = "floor:ready"        # set while the board is fresh
+
+floor_channel = PubSubChannel("floor:tables")
+
+
+def to_cents(amount: Decimal) -> int:
+    return int((Decimal(amount) * 100).to_integral_value())
+
+
+class FloorState:
+    """
+    Live floor plan: occupancy, open bill and current waiter of every table, kept in Redis.
+
+    Each table is one small hash (table_number, capacity, location, occupied,
+    open_orders, open_cents, waiter_id). For every order, payment and table event the
+    "cache" event consumer re-reads that table's row with the board query, writes it in a
+    MULTI transaction and publishes it on `floor_channel`, so tablets get a snapshot
+    once and only changed tables after.
+
+    The board is rebuilt from the database with one grouped query when READY_KEY
+    expires (FLOOR_STATE_TTL). A Redis failure never fails a read; the snapshot then
+    comes from the database.
+    """
+
+    @staticmethod
+    def _board_query():
+        open_orders = and_(
+            Order.table_id == RestaurantTable.id,
+            Order.is_paid == False,  # "= false" ix_order_table_unpaid ile eşleşir, "IS false" eşleşmez
+            Order.status != OrderStatus.CANCELED,
+        )
+        # dolu masanın garsonu: masadaki en son siparişin garsonu
+        latest = aliased(Order)
+        latest_waiter = (
+            select(latest.waiter_id)
+            .where(latest.table_id == RestaurantTable.id)
+            .order_by(latest.created_at.desc())
+            .limit(1)
+            .correlate(RestaurantTable)
+            .scalar_subquery()
+        )
+        return (
+            select(
+                RestaurantTable.id,
+                RestaurantTable.table_number,
+                RestaurantTable.capacity,
+                RestaurantTable.location,
+                RestaurantTable.is_occupied,
+                func.count(Order.id).label("open_orders"),
+                func.coalesce(func.sum(Order.total_amount), 0).label("open_total"),
+                case((RestaurantTable.is_occupied, latest_waiter), else_=None).label("waiter_id"),
+            )
+            .outerjoin(Order, open_orders)
+            .group_by(RestaurantTable.id)
+        )
+
+    @staticmethod
+    def _fields(row) -> Dict[str, str]:
+        return {
+            "table_number": row.table_number,
+            "capacity": str(row.capacity),
+            "location": row.location or "",
+            "occupied": "1" if row.is_occupied else "0",
+            "open_orders": str(row.open_orders),
+            "open_cents": str(to_cents(row.open_total)),
+            "waiter_id": str(row.waiter_id) if row.waiter_id else "",
+        }
+
+    @staticmethod
+    def _response(table_id, fields: Dict[str, str]) -> FloorTableResponse:
+        open_orders = int(fields.get("open_orders") or 0)
+        return FloorTableResponse(
+            table_id=table_id,
+            table_number=fields.get("table_number", ""),
+            capacity=int(fields.get("capacity") or 0),
+            location=fields.get("location") or None,
+            is_occupied=fields.get("occupied") == "1" or open_orders > 0,
+            open_orders=open_orders,
+            open_total=Decimal(int(fields.get("open_cents") or 0)).scaleb(-2),
+            waiter_id=fields.get("waiter_id") or None,
+        )
+
+    async def rebuild(self, session: AsyncSession) -> List[FloorTableResponse]:
+        rows = (await session.execute(self._board_query())).all()
+        board = {str(row.id): self._fields(row) for row in rows}
+
+        redis = await get_redis()
+        old_ids = await redis.smembers(IDS_KEY)
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.delete(IDS_KEY, *(TABLE_KEY.format(table_id) for table_id in old_ids))
+            if board:
+                pipe.sadd(IDS_KEY, *board)
+            for table_id, fields in board.items():
+                pipe.hset(TABLE_KEY.format(table_id), mapping=fields)
+            pipe.set(READY_KEY, "1", ex=settings.FLOOR_STATE_TTL)
+            await pipe.execute()
+        logger.info(f"Floor board rebuilt | tables={len(board)}")
+        return self._sorted([self._response(table_id, fields) for table_id, fields in board.items()])
+
+    @staticmethod
+    def _sorted(tables: List[FloorTableResponse]) -> List[FloorTableResponse]:
+        return sorted(tables, key=lambda table: table.table_number)
+
+    async def snapshot(self, session: AsyncSession) -> List[FloorTableResponse]:
+        """Every table on the board; one SMEMBERS and one pipelined HGETALL round trip when fresh."""
+        try:
+            redis = await get_redis()
+            if not await redis.exists(READY_KEY):
+                return await self.rebuild(session)
+            table_ids = list(await redis.smembers(IDS_KEY))
+            async with redis.pipeline(transaction=False) as pipe:
+                for table_id in table_ids:
+                    pipe.hgetall(TABLE_KEY.format(table_id))
+                rows = await pipe.execute()
+            return self._sorted([self._response(table_id, fields) for table_id, fields in zip(table_ids, rows)])
+        except Exception as e:
+            logger.error(f"Floor board unavailable, reading from the database: {e}")
+            rows = (await session.execute(self._board_query())).all()
+            return self._sorted([self._response(row.id, self._fields(row)) for row in rows])
+
+    async def refresh(self, session: AsyncSession, table_id: Optional[UUID]):
+        """
+        Re-reads one table's row after a committed change and publishes it.
+
+        Idempotent: a late or redelivered event writes the same row again, so it never
+        skews the board. A Redis or database error raises and the event is retried.
+        """
+        if table_id is None:
+            return
+        key = TABLE_KEY.format(table_id)
+        redis = await get_redis()
+        if not await redis.exists(READY_KEY):
+            # Yeniden kurulum commit edilmiş değişikliği zaten içerir
+            await self.rebuild(session)
+            fields = await redis.hgetall(key)
+        else:
+            row = (await session.execute(self._board_query().where(RestaurantTable.id == table_id))).first()
+            if row is None:
+                return
+            fields = self._fields(row)
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.sadd(IDS_KEY, str(table_id))
+                pipe.hset(key, mapping=fields)
+                await pipe.execute()
+        table = self._response(table_id, fields)
+        await floor_channel.publish({"type": "floor.table", "table": table.model_dump(mode="json")})
+
+    async def invalidate(self):
+        """Forces a rebuild on the next read or change (e.g. after bulk inserts)."""
+        try:
+            redis = await get_redis()
+            await redis.delete(READY_KEY)
+        except Exception as e:
+            logger.error(f"Failed to invalidate the floor board: {e}")
+
+
+floor_state = FloorState()
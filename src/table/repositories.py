@@ -1,6 +1,7 @@
-from sqlalchemy import select
-from typing import Optional
-from src.db.models import RestaurantTable
+from sqlalchemy import case, exists, func, select, update
+from uuid import UUID
+from typing import List, Optional, Tuple
+from src.db.models import Order, OrderStatus, RestaurantTable
 from src.utils.base_repository import BaseRepository
 
 class TableRepository(BaseRepository[RestaurantTable]):
@@ -10,4 +11,65 @@ class TableRepository(BaseRepository[RestaurantTable]):
     async def get_by_table_number(self, table_number: str) -> Optional[RestaurantTable]:
         stmt = select(RestaurantTable).where(RestaurantTable.table_number == table_number)
         result = await self.session.execute(stmt)
-        return result.unique().scalars().first()
\ No newline at end of file
+        return result.scalars().first()
+
+    async def get_tables_page(
+        self, limit: int, cursor: Optional[str] = None, is_occupied: Optional[bool] = None, location: Optional[str] = None
+    ) -> Tuple[List[RestaurantTable], Optional[str]]:
+        filters = []
+        if is_occupied is not None:
+            filters.append(RestaurantTable.is_occupied == is_occupied)
+        if location is not None:
+            filters.append(RestaurantTable.location == location)
+        return await self.get_page(limit, cursor, filters=filters)
+
+
+    async def mark_occupied(self, table_id: UUID) -> None:
+        """
+        Seats the table; does not commit, so it lands with the caller's write.
+
+        The UPDATE always matches the row, so the order insert holds the table's row lock
+        until it commits and a concurrent lock_for_close waits for it (or it waits for the
+        close and re-seats the table afterwards).
+        """
+        stmt = (
+            update(RestaurantTable)
+            .where(RestaurantTable.id == table_id)
+            .values(
+                is_occupied=True,
+                occupied_at=case(
+                    (RestaurantTable.is_occupied, RestaurantTable.occupied_at), else_=func.now()
+                ),
+            )
+        )
+        await self.session.execute(stmt)
+
+    async def lock_for_close(self, table_id: UUID):
+        """Locks the table row (FOR UPDATE) and returns its occupant, or None if there is no such table."""
+        stmt = select(RestaurantTable.occupied_by).where(RestaurantTable.id == table_id).with_for_update()
+        return (await self.session.execute(stmt)).first()
+
+    async def close_if_settled(self, table_id: UUID):
+        """
+        Frees the table unless it still has an unpaid, non-canceled order.
+
+        Returns the updated row (plain columns, so it outlives the commit) or None if blocked.
+
+        Call after lock_for_close in the same transaction. Under READ COMMITTED the
+        NOT EXISTS subquery reads the statement's snapshot, so it must be a statement
+        issued after the lock to see orders committed by the inserts we waited for.
+        Does not commit.
+        """
+        open_orders = exists().where(
+            Order.table_id == RestaurantTable.id,
+            Order.is_paid == False,  # "= false" ix_order_table_unpaid ile eşleşir, "IS false" eşleşmez
+            Order.status != OrderStatus.CANCELED,
+        )
+        stmt = (
+            update(RestaurantTable)
+            .where(RestaurantTable.id == table_id, ~open_orders)
+            .values(is_occupied=False, occupied_by=None)
+            .returning(*RestaurantTable.__table__.c)
+            .execution_options(synchronize_session=False)
+        )
+        return (await self.session.execute(stmt)).first()
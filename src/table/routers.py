@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, Response, WebSocket, status
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 from uuid import UUID
 
+from src.auth.dependencies import get_websocket_token_data
+from src.utils.websockets import stream_channel
+from src.db.database import AsyncSession as SessionFactory
 from src.db.dependencies import get_db
-from src.table.schemas import TableCreate, TableResponse, TableUpdate
+from src.table.floor import floor_channel
+from src.table.schemas import FloorTableResponse, TableCreate, TableResponse, TableUpdate
 from src.table.repositories import TableRepository
 from src.table.services import TableService
+from src.utils.pagination import PageParams, set_next_cursor
 
 router = APIRouter(prefix="/tables", tags=["Tables"])
 
@@ -19,10 +26,36 @@ async def create_table(
 
 @router.get("/", response_model=list[TableResponse])
 async def list_tables(
-db: AsyncSession = Depends(get_db),
+    response: Response,
+    is_occupied: Optional[bool] = Query(None, description="Filter by occupancy"),
+    location: Optional[str] = Query(None, description="Filter by location"),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_db),
 ):
     service = TableService(TableRepository(db))
-    return await service.get_all_tables()
+    tables, next_cursor = await service.get_all_tables(page, is_occupied=is_occupied, location=location)
+    set_next_cursor(response, next_cursor)
+    return tables
+
+@router.get("/floor", response_model=list[FloorTableResponse])
+async def get_floor(db: AsyncSession = Depends(get_db)):
+    """Salon planı: masa başına doluluk, açık hesap ve garson."""
+    service = TableService(TableRepository(db))
+    return await service.get_floor()
+
+@router.websocket("/floor/stream")
+async def floor_stream(
+    websocket: WebSocket,
+    _token: dict = Depends(get_websocket_token_data),
+):
+    """Host tabletleri: bağlanınca tüm salon, sonra sadece değişen masalar."""
+
+    async def send_snapshot():
+        async with SessionFactory() as db:
+            tables = await TableService(TableRepository(db)).get_floor()
+        await websocket.send_json({"type": "snapshot", "tables": jsonable_encoder(tables)})
+
+    await stream_channel(websocket, floor_channel, send_snapshot)
 
 @router.patch("/{table_id}", response_model=TableResponse)
 async def update_table(
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from uuid import UUID
+from decimal import Decimal
 from typing import Optional
 
 class TableCreate(BaseModel):
@@ -20,4 +21,14 @@ class TableResponse(BaseModel):
 
     model_config = {
     "from_attributes": True
-    }
\ No newline at end of file
+    }
+
+class FloorTableResponse(BaseModel):
+    table_id: UUID
+    table_number: str
+    capacity: int
+    location: Optional[str]
+    is_occupied: bool
+    open_orders: int
+    open_total: Decimal
+    waiter_id: Optional[UUID]
@@ -1,3 +1,7 @@
+from sqlalchemy.dialects.postgresql import insert
+
+from src.db.models import RestaurantTable
+
 tables_data = [
 {"table_number": "T1", "capacity": 2},
 {"table_number": "T2", "capacity": 4},
@@ -5,10 +9,12 @@ tables_data = [
 {"table_number": "T4", "capacity": 6},
 {"table_number": "T5", "capacity": 3}
 ]
-async def seed_tables(db):
-    from src.table.repositories import TableRepository
-    from src.table.schemas import TableCreate
-    repo = TableRepository(db)
-    for t in tables_data:
-        if not await repo.get_by_table_number(t["table_number"]):
-            await repo.create(TableCreate(**t))
\ No newline at end of file
+async def seed_tables(db) -> int:
+    """Inserts the missing tables in one statement; returns how many were added. Does not commit."""
+    stmt = (
+        insert(RestaurantTable)
+        .values([{**table, "is_occupied": False, "is_active": True} for table in tables_data])
+        .on_conflict_do_nothing(index_elements=[RestaurantTable.table_number])
+    )
+    result = await db.execute(stmt)
+    return result.rowcount
@@ -1,7 +1,12 @@
 from fastapi import HTTPException
-from uuid import UUID
+from uuid import UUID, uuid4
+from typing import Optional
 from src.table.schemas import TableCreate, TableUpdate
 from src.table.repositories import TableRepository
+from src.table.floor import floor_state
+from src.events.relay import outbox_relay
+from src.events.repositories import OutboxRepository
+from src.utils.pagination import PageParams
 
 class TableService:
     def __init__(self, repo: TableRepository):
@@ -9,23 +14,40 @@ class TableService:
 
 
     async def create_table(self, request: TableCreate):
-        return await self.repo.create(request)
+        # Olay masayla aynı commit'te yazılır; id önceden verilir ki olay ona bağlansın
+        values = {**request.model_dump(), "id": uuid4(), "is_occupied": False}
+        OutboxRepository(self.repo.session).add("table.saved", values["id"], values)
+        table = await self.repo.create(values)
+        outbox_relay.wake()
+        return table
 
-    async def get_all_tables(self):
-        return await self.repo.get_all()
+    async def get_all_tables(self, page: PageParams, is_occupied: Optional[bool] = None, location: Optional[str] = None):
+        return await self.repo.get_tables_page(page.limit, page.cursor, is_occupied=is_occupied, location=location)
 
     async def update_table(self, table_id: UUID, data: TableUpdate):
         table = await self.repo.get_by_id(table_id)
         if not table:
             raise HTTPException(404, "Masa bulunamadı")
-        return await self.repo.update(table_id, data)
+        OutboxRepository(self.repo.session).add("table.saved", table_id, data.model_dump(exclude_unset=True))
+        table = await self.repo.update(table_id, data)
+        outbox_relay.wake()
+        return table
+
+    async def get_floor(self):
+        """Occupancy, open bill and waiter of every table in one payload."""
+        return await floor_state.snapshot(self.repo.session)
 
     async def close_table(self, table_id: UUID):
-        table = await self.repo.get_by_id(table_id)
-        if not table:
+        # Kontrol ve güncelleme tek transaction'da, masa satırı kilitliyken yapılır
+        locked = await self.repo.lock_for_close(table_id)
+        if locked is None:
+            await self.repo.session.rollback()
             raise HTTPException(404, "Masa bulunamadı")
-        unpaid_orders = [order for order in table.orders if not order.is_paid]
-        if unpaid_orders:
+        table = await self.repo.close_if_settled(table_id)
+        if table is None:
+            await self.repo.session.rollback()
             raise HTTPException(400, "Tüm siparişler ödenmeden masa kapatılamaz")
-        update_data = {"is_occupied": False, "occupied_by": None}
-        return await self.repo.update(table_id, update_data)
\ No newline at end of file
+        OutboxRepository(self.repo.session).add("table.closed", table_id, {"customer_id": locked.occupied_by})
+        await self.repo.session.commit()
+        outbox_relay.wake()
+        return table
@@ -1,11 +1,9 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.db.dependencies import get_db
-from src.user.repositories import UserRepository
-from src.db.models import User
 from src.auth.dependencies import get_current_user
-from src.auth.schemas import UserProfileResponse
+from src.auth.schemas import UserPrincipal
 from src.db.models import UserTypes
 async def get_order_db() -> AsyncSession:
     """Order modülü için veritabanı oturumu sağlar."""
@@ -13,21 +11,15 @@ async def get_order_db() -> AsyncSession:
 
 
 async def get_order_current_user(
-    user: UserProfileResponse = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
-) -> User:
-    """Giriş yapmış kullanıcıyı döner — müşteri mi kontrol edebilirsin."""
-
-    repo = UserRepository(db)
-    full_user = await repo.get_by_id(user.id)
-    if not full_user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    return full_user
+    user: UserPrincipal = Depends(get_current_user),
+) -> UserPrincipal:
+    """Giriş yapmış kullanıcıyı döner — rol kontrolü önbellekteki principal ile yapılır, DB'ye gidilmez."""
+    return user
 
 
 async def get_current_customer(
-    user: User = Depends(get_order_current_user)
-) -> User:
+    user: UserPrincipal = Depends(get_order_current_user)
+) -> UserPrincipal:
     """Sadece müşteri rolünde kullanıcıya izin verir."""
     if user.type != UserTypes.Customer.value :
         raise HTTPException(status_code=403, detail="Only customers can perform this action.")
@@ -35,8 +27,8 @@ async def get_current_customer(
 
 
 async def get_current_waiter(
-    user: User = Depends(get_order_current_user)
-) -> User:
+    user: UserPrincipal = Depends(get_order_current_user)
+) -> UserPrincipal:
     """Sadece garson rolünde kullanıcıya izin verir."""
     if user.type != "waiter":
         raise HTTPException(status_code=403, detail="Only waiters can access this endpoint.")
@@ -44,16 +36,25 @@ async def get_current_waiter(
 
 
 async def get_current_kitchen_staff(
-    user: User = Depends(get_order_current_user)
-) -> User:
+    user: UserPrincipal = Depends(get_order_current_user)
+) -> UserPrincipal:
     """Sadece mutfak personeli erişebilir."""
     if user.type != "kitchen_staff":
         raise HTTPException(status_code=403, detail="Only kitchen staff can access this.")
     return user
 
 async def get_current_customer(
-    user: User = Depends(get_order_current_user)
-) -> User:
+    user: UserPrincipal = Depends(get_order_current_user)
+) -> UserPrincipal:
     if user.type != "customer":
         raise HTTPException(status_code=403, detail="Only customers can perform this action.")
     return user
+
+
+async def get_current_admin(
+    user: UserPrincipal = Depends(get_order_current_user)
+) -> UserPrincipal:
+    """Sadece yöneticiler erişebilir."""
+    if user.type != UserTypes.admin.value:
+        raise HTTPException(status_code=403, detail="Only admins can access this endpoint.")
+    return user
@@ -7,11 +7,35 @@ from src.db.models import(
     KitchenStaff
 )
 from sqlalchemy.future import select
-from typing import Optional, Type
+from typing import Optional, Type, Union
+from uuid import UUID
+from decimal import Decimal
+from pydantic import BaseModel
+from src.auth.schemas import UserPrincipal
+from src.auth.principal_cache import principal_cache
 class UserRepository(BaseRepository[User]):
     def __init__(self, session):
         super().__init__(User, session)
 
+    async def get_principal(self, user_id) -> Optional[UserPrincipal]:
+        # Query the base table directly: going through the mapper would join every subclass table
+        users = User.__table__
+        stmt = select(
+            users.c.id, users.c.type, users.c.primary_email, users.c.primary_email_verified
+        ).where(users.c.id == user_id)
+        row = (await self.session.execute(stmt)).first()
+        return UserPrincipal.model_validate(row) if row else None
+
+    async def update(self, obj_id: str, update_data: Union[BaseModel, dict]) -> Optional[User]:
+        user = await super().update(obj_id, update_data)
+        await principal_cache.invalidate(obj_id)
+        return user
+
+    async def delete(self, obj_id: str) -> bool:
+        deleted = await super().delete(obj_id)
+        await principal_cache.invalidate(obj_id)
+        return deleted
+
     async def create_user_with_customer(self, user_data: dict) -> User:
         # Create user instance
         customer = Customer(**user_data)
@@ -39,22 +63,35 @@ class WaiterRepository(BaseRepository[Waiter]):
     def __init__(self, session):
         super().__init__(Waiter, session)
 
-    async def increment_tables_served(self, waiter_id: int):
+    async def increment_tables_served(self, waiter_id: UUID):
         return await self.increment_field(waiter_id, "total_tables_served")
 
-    async def increment_orders_taken(self, waiter_id: int):
+    async def increment_orders_taken(self, waiter_id: UUID):
         return await self.increment_field(waiter_id, "total_orders_taken")
+
+    # record_* sayaçları tamponlar; istek başına DB yazımı yapılmaz
+    def record_table_served(self, waiter_id: UUID):
+        self.buffer_increment(waiter_id, "total_tables_served")
+
+    def record_order_taken(self, waiter_id: UUID):
+        self.buffer_increment(waiter_id, "total_orders_taken")
     
 
 class CustomerRepository(BaseRepository[Customer]):
     def __init__(self, session):
         super().__init__(Customer, session)
 
-    async def increment_visits(self, customer_id: int):
+    async def increment_visits(self, customer_id: UUID):
         return await self.increment_field(customer_id, "total_visits")
 
-    async def increment_spent(self, customer_id: int, amount: int):
+    async def increment_spent(self, customer_id: UUID, amount: Decimal):
         return await self.increment_field(customer_id, "total_amount_spent", step=amount)
+
+    def record_visit(self, customer_id: UUID):
+        self.buffer_increment(customer_id, "total_visits")
+
+    def record_spent(self, customer_id: UUID, amount: Decimal):
+        self.buffer_increment(customer_id, "total_amount_spent", step=amount)
     
 
 
@@ -62,7 +99,8 @@ class KitchenStaffRepository(BaseRepository[KitchenStaff]):
     def __init__(self, session):
         super().__init__(KitchenStaff, session)
 
-    async def increment_orders_prepared(self, staff_id: int):
+    async def increment_orders_prepared(self, staff_id: UUID):
         return await self.increment_field(staff_id, "total_orders_prepared")
 
-
+    def record_order_prepared(self, staff_id: UUID):
+        self.buffer_increment(staff_id, "total_orders_prepared")
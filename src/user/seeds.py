@@ -1,21 +1,12 @@
 from datetime import date
 import uuid
-from passlib.context import CryptContext
 
 from src.db.models import Waiter, RestaurantTable, KitchenStaff
-from src.core.settings import settings
 from src.db.database import AsyncSession
+from src.auth.utils import generate_passwd_hash
 from loguru import logger
 
 
-passwd_context = CryptContext(schemes=[settings.CRYPTO_SCHEME])
-
-
-async def generate_passwd_hash(password: str) -> str:
-    logger.debug("Generating password hash")
-    return passwd_context.hash(password)
-
-
 async def seed():
     logger.debug("Seeding initial data")
 
@@ -1,8 +1,12 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import update
+from decimal import Decimal
 from sqlalchemy.exc import NoResultFound
-from typing import Type, TypeVar, Generic, List, Optional, Union
+from typing import Type, TypeVar, Generic, List, Optional, Union, Tuple, Sequence
 from src.db.database import Base
+from src.utils.pagination import apply_keyset, split_page
+from src.core.counters import counter_buffer
 from pydantic import BaseModel
 
 T = TypeVar("T", bound=Base)
@@ -20,15 +24,30 @@ class BaseRepository(Generic[T]):
         await self.session.refresh(obj)
         return obj
 
-    async def get_by_id(self, obj_id: str) -> Optional[T]:
-        stmt = select(self.model).where(self.model.id == obj_id)
+    async def get_by_id(self, obj_id: str, options: Sequence = ()) -> Optional[T]:
+        """`options` is a loader profile from src.db.loaders; without one only the columns load."""
+        stmt = select(self.model).where(self.model.id == obj_id).options(*options)
         result = await self.session.execute(stmt)
-        return result.unique().scalars().first()
+        return result.scalars().first()
 
     async def get_all(self) -> List[T]:
         stmt = select(self.model)
         result = await self.session.execute(stmt)
-        return result.unique().scalars().all()
+        return result.scalars().all()
+
+    async def get_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        filters: Sequence = (),
+        descending: bool = False,
+        options: Sequence = (),
+    ) -> Tuple[List[T], Optional[str]]:
+        """Keyset page over (created_at, id); returns the rows and the cursor of the next page."""
+        stmt = select(self.model).where(*filters).options(*options)
+        stmt = apply_keyset(stmt, self.model, limit, cursor, descending)
+        result = await self.session.execute(stmt)
+        return split_page(result.scalars().all(), limit)
 
     async def update(self, obj_id: str, update_data: Union[BaseModel, dict]) -> Optional[T]:
         obj = await self.get_by_id(obj_id)
@@ -49,14 +68,35 @@ class BaseRepository(Generic[T]):
         await self.session.commit()
         return True
 
-    async def increment_field(self, obj_id: Union[str, int], field_name: str, step: int = 1) -> Optional[T]:
-        obj = await self.get_by_id(obj_id)
-        if not obj:
-            return None
-        if hasattr(obj, field_name):
-            current_value = getattr(obj, field_name, 0)
-            setattr(obj, field_name, current_value + step)
+    def _counter_column(self, field_name: str):
+        column = self.model.__mapper__.columns.get(field_name)
+        if column is None:
+            raise AttributeError(f"{self.model.__name__} has no field '{field_name}'")
+        return column
+
+    async def increment_field(
+        self, obj_id: Union[str, int], field_name: str, step: Union[int, Decimal] = 1, commit: bool = True
+    ) -> Optional[Union[int, Decimal]]:
+        """
+        Adds `step` to the column in a single UPDATE ... RETURNING and returns the new value.
+
+        The addition happens in the database, so concurrent increments never overwrite each other.
+        Returns None if the row does not exist.
+        """
+        column = self._counter_column(field_name)
+        # Alt sınıf kolonları kendi tablosunda durur (ör. waiter.total_orders_taken)
+        table = column.table
+        stmt = (
+            update(table)
+            .where(table.c.id == obj_id)
+            .values({column.name: column + step})
+            .returning(column)
+        )
+        new_value = (await self.session.execute(stmt)).scalar_one_or_none()
+        if commit:
             await self.session.commit()
-            await self.session.refresh(obj)
-            return obj
-        raise AttributeError(f"{self.model.__name__} has no field '{field_name}'")
\ No newline at end of file
+        return new_value
+
+    def buffer_increment(self, obj_id, field_name: str, step: Union[int, Decimal] = 1):
+        """Queues the increment on the process-wide counter buffer; it reaches the database on the next flush."""
+        counter_buffer.add(self._counter_column(field_name), obj_id, step)
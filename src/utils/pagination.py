@@ -0,0 +1,71 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from fastapi import Query, Response
+from sqlalchemy import Select, tuple_
+
+from src.errors import InvalidCursor
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    """Query parameters shared by every paginated list endpoint."""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+        cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+
+def encode_cursor(created_at: datetime, obj_id: UUID) -> str:
+    raw = json.dumps([created_at.isoformat(), str(obj_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, obj_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), UUID(obj_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor()
+
+
+def apply_keyset(stmt: Select, model, limit: int, cursor: Optional[str], descending: bool = False) -> Select:
+    """
+    Orders `stmt` by (created_at, id) and starts it after `cursor`.
+
+    Fetches one extra row so `split_page` can tell whether a next page exists.
+    """
+    key = tuple_(model.created_at, model.id)
+    if cursor:
+        after = tuple_(*decode_cursor(cursor))
+        stmt = stmt.where(key < after if descending else key > after)
+    if descending:
+        stmt = stmt.order_by(model.created_at.desc(), model.id.desc())
+    else:
+        stmt = stmt.order_by(model.created_at, model.id)
+    return stmt.limit(limit + 1)
+
+
+def split_page(rows: Sequence[Any], limit: int) -> Tuple[List[Any], Optional[str]]:
+    """Returns (page rows, next cursor); rows must expose `created_at` and `id`."""
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(last.created_at, last.id)
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
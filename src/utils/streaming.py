@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Sequence
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.database import AsyncSession as SessionFactory
+
+EXPORT_BATCH_SIZE = 1000
+
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv",
+    ExportFormat.NDJSON: "application/x-ndjson",
+}
+
+Partitions = AsyncIterator[Sequence[Sequence[Any]]]
+
+
+def _plain(value: Any) -> Any:
+    # str-mixin enum'lar csv'de "OrderStatus.IN_PROGRESS" olarak yazılır, değerini kullan
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+async def iter_csv(columns: Sequence[str], partitions: Partitions) -> AsyncIterator[str]:
+    """Header line, then one chunk per partition; only a single partition is held in memory."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    async for rows in partitions:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_plain(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+
+
+async def iter_ndjson(columns: Sequence[str], partitions: Partitions) -> AsyncIterator[str]:
+    """One JSON object per line, one chunk per partition."""
+    async for rows in partitions:
+        yield "".join(
+            json.dumps({name: _plain(value) for name, value in zip(columns, row)}, default=str) + "\n"
+            for row in rows
+        )
+
+
+async def stream_in_own_session(fetch: Callable[[AsyncSession], Partitions]) -> Partitions:
+    """
+    Runs `fetch` in a session owned by the response body.
+
+    The request's get_db session is closed before a StreamingResponse starts sending,
+    so the export opens its own and keeps it for as long as the client keeps reading.
+    """
+    async with SessionFactory() as session:
+        async for rows in fetch(session):
+            yield rows
+
+
+def export_response(
+    columns: Sequence[str], partitions: Partitions, export_format: ExportFormat, filename: str
+) -> StreamingResponse:
+    chunks = iter_csv(columns, partitions) if export_format == ExportFormat.CSV else iter_ndjson(columns, partitions)
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format.value}"'},
+    )
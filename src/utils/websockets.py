@@ -0,0 +1,48 @@
+import asyncio
+from typing import Awaitable, Callable
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from src.core.redis_manager import PubSubChannel
+
+
+async def _until_disconnect(websocket: WebSocket):
+    # İstemcinin gönderdiklerini yok say, sadece kapanışı bekle
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+async def stream_channel(
+    websocket: WebSocket,
+    channel: PubSubChannel,
+    send_snapshot: Callable[[], Awaitable[None]],
+):
+    """
+    Sends a snapshot, then every message of `channel`, until the client goes away.
+
+    Subscribes before the snapshot so no change published in between is missed, and
+    sends a fresh snapshot when the channel reports lost messages. Waiting for the
+    next message races a read of the socket, so a client that disconnects during a
+    quiet period releases its subscriber queue right away.
+    """
+    await websocket.accept()
+    queue = await channel.subscribe()
+    disconnected = asyncio.create_task(_until_disconnect(websocket))
+    try:
+        await send_snapshot()
+        while True:
+            next_message = asyncio.create_task(queue.get())
+            await asyncio.wait({next_message, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                next_message.cancel()
+                break
+            message = next_message.result()
+            if message == channel.RESYNC:
+                await send_snapshot()
+            else:
+                await websocket.send_json(message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        disconnected.cancel()
+        channel.unsubscribe(queue)